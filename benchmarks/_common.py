@@ -0,0 +1,28 @@
+"""Timing loop shared by the benchmarks that race an app function against the implementation it replaced."""
+import time
+
+def best_of(fn, arg, repeat=3):
+    """The fastest of repeat calls to fn(arg), in seconds, and the last call's result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def race(sizes, make_input, reference, candidate, check, labels):
+    """Time reference and candidate on make_input(size) for each size and print one row per size.
+
+    check(arg, old, new) raises when the two results disagree. labels name the size, reference and
+    candidate columns.
+    """
+    size_label, reference_label, candidate_label = labels
+    reference_label, candidate_label = f'{reference_label} (s)', f'{candidate_label} (s)'
+    widths = (10, len(reference_label) + 1, len(candidate_label) + 1, 9)
+    print(f"{size_label:>{widths[0]}} {reference_label:>{widths[1]}} {candidate_label:>{widths[2]}} {'speedup':>{widths[3]}}")
+    for size in sizes:
+        arg = make_input(size)
+        old_t, old = best_of(reference, arg)
+        new_t, new = best_of(candidate, arg)
+        check(arg, old, new)
+        print(f"{size:>{widths[0]},} {old_t:>{widths[1]}.3f} {new_t:>{widths[2]}.3f} {old_t / new_t:>{widths[3] - 1}.1f}x")
@@ -0,0 +1,45 @@
+"""Benchmark the CDK workbook readers: pd.read_excel (openpyxl) against ingest.read_cdk_sheet.
+
+    python benchmarks/bench_cdk.py [rows ...]
+"""
+import sys, tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import read_cdk_sheet
+from synth_data import store_layout, write_cdk_workbook
+from _common import race
+
+def read_excel_openpyxl(path):
+    """load_current_data's read before read_cdk_sheet."""
+    return pd.read_excel(path, header=4, usecols='B:O')
+
+def check_without_calamine(path, expected):
+    """read_cdk_sheet must fall through to read_xlsx_table when calamine is unavailable: python-calamine
+    missing (ImportError) or pandas older than 2.2 (ValueError: Unknown engine)."""
+    read_excel = pd.read_excel
+    for error in (ImportError("Missing optional dependency 'python-calamine'"), ValueError('Unknown engine: calamine')):
+        def no_calamine(*args, engine=None, **kwargs):
+            if engine == 'calamine':
+                raise error
+            raise AssertionError(f'read_cdk_sheet went to read_excel after {error!r}')
+        pd.read_excel = no_calamine
+        try:
+            pd.testing.assert_frame_equal(read_cdk_sheet(path), expected)
+        finally:
+            pd.read_excel = read_excel
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 50_000]
+    def same_sheet(path, old, new):
+        pd.testing.assert_frame_equal(old, new)
+        check_without_calamine(path, old)
+    with tempfile.TemporaryDirectory() as tmp:
+        def workbook(rows):
+            path = Path(tmp) / f'InventoryUpdate_{rows}.xlsx'
+            write_cdk_workbook(path, np.random.default_rng(0), rows, store_layout(4))
+            return path
+        race(sizes, workbook, read_excel_openpyxl, read_cdk_sheet, same_sheet,
+             ('rows', 'read_excel', 'read_cdk_sheet'))
@@ -0,0 +1,39 @@
+"""Benchmark the per-unit dedup (ingest.latest_per_unit) against the original sort + drop_duplicates.
+
+    python benchmarks/bench_dedup.py [rows ...]
+"""
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import latest_per_unit
+from _common import race
+
+def dedup_sorted(df):
+    """build_combined_data's sort + drop_duplicates, which latest_per_unit replaced."""
+    df = df.sort_values(['DEALER_NAME', 'UNIT_KEY', 'ETA'], na_position='last')
+    return df.drop_duplicates(subset=['DEALER_NAME', 'UNIT_KEY'], keep='last')
+
+def synthetic_units(rows, seed=0):
+    """Units spread over four dealers; ~15% of the rows repeat a unit, some ETAs are missing or tied."""
+    rng = np.random.default_rng(seed)
+    dealers = np.array(['MODERN NISSAN OF CONCORD', 'MODERN NISSAN OF HICKORY',
+                        'MODERN NISSAN, LLC', 'MODERN NISSAN/LAKE NORMAN'])
+    units = rng.integers(0, int(rows * 0.85), size=rows)
+    eta = pd.Timestamp('2026-01-01') + pd.to_timedelta(rng.integers(0, 120, size=rows), unit='D')
+    eta = pd.Series(eta).mask(rng.random(rows) < 0.05)
+    return pd.DataFrame({
+        'DEALER_NAME': pd.Series(dealers[units % 4], dtype='str'),
+        'UNIT_KEY': pd.Series([f'1N4BL4DV{u:09d}' for u in units], dtype='str'),
+        'ETA': eta,
+        'ROW': np.arange(rows),  # tells tied rows apart in the equality check
+    })
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000, 1_000_000]
+    def same_units(df, old, new):
+        pd.testing.assert_frame_equal(old.reset_index(drop=True), new.reset_index(drop=True))
+    race(sizes, synthetic_units, dedup_sorted, latest_per_unit, same_units,
+         ('rows', 'sort+dedup', 'latest_per_unit'))
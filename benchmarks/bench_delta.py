@@ -0,0 +1,58 @@
+"""Benchmark inventory_delta.diff_inventory on two synthetic snapshots of the All Stores frame.
+
+    python benchmarks/bench_delta.py [rows ...]
+
+Before timing, checks that units follow combined_data's rules: a missing ETA counts as the latest,
+and the same UNIT_KEY at two dealers is two units.
+"""
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inventory_delta import diff_inventory, summarize_delta
+from bench_dedup import synthetic_units
+from _common import best_of
+
+def check_unit_rules():
+    """A unit whose repeated row has no ETA, and a UNIT_KEY stocked at two dealers."""
+    eta = pd.to_datetime
+    before = pd.DataFrame({
+        'DEALER_NAME': ['MODERN NISSAN OF CONCORD'] * 3 + ['MODERN NISSAN OF HICKORY'],
+        'UNIT_KEY': ['1N4BL4DV000000001', '1N4BL4DV000000001', '1N4BL4DV000000002', '1N4BL4DV000000002'],
+        'ETA': eta(['2026-04-01', None, '2026-06-01', '2026-07-01']),
+    })
+    after = before.assign(ETA=eta(['2026-05-01', None, '2026-06-01', '2026-08-01']))
+    delta = diff_inventory(before, after)
+    changed = delta['changed']
+    # The undated row is the one kept on both sides, so only the Hickory unit's ETA moved
+    assert delta['added'].empty and delta['removed'].empty, delta
+    assert changed[['DEALER_NAME', 'UNIT_KEY', 'COLUMN', 'BEFORE', 'AFTER']].values.tolist() == [
+        ['MODERN NISSAN OF HICKORY', '1N4BL4DV000000002', 'ETA', '07-01-2026', '08-01-2026'],
+    ], changed
+    # Trading the unit from Concord to Hickory removes it at one dealer and adds it at the other
+    moved = diff_inventory(before.iloc[:3], before.iloc[:2].assign(DEALER_NAME='MODERN NISSAN OF HICKORY'))
+    counts = summarize_delta(moved)
+    assert (counts['added'], counts['removed'], counts['moved']) == (1, 2, 1), counts
+
+def synthetic_snapshots(rows, seed=0):
+    """A snapshot and the next upload: ~2% of the units gone, ~2% new, ~5% with a new ETA."""
+    rng = np.random.default_rng(seed)
+    before = synthetic_units(rows, seed).drop(columns='ROW')
+    after = before[rng.random(rows) >= 0.02]
+    shifted = rng.random(len(after)) < 0.05
+    after = after.assign(ETA=after['ETA'].mask(shifted, after['ETA'] + pd.Timedelta(days=7)))
+    new = synthetic_units(rows // 50, seed + 1).drop(columns='ROW')
+    new['UNIT_KEY'] = 'NEW' + new['UNIT_KEY']
+    return before, pd.concat([after, new], ignore_index=True)
+
+if __name__ == '__main__':
+    check_unit_rules()
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000, 250_000]
+    print(f"{'rows':>10} {'diff_inventory (s)':>19} {'added':>8} {'removed':>8} {'changed':>8}")
+    for rows in sizes:
+        before, after = synthetic_snapshots(rows)
+        seconds, delta = best_of(lambda snapshots: diff_inventory(*snapshots), (before, after))
+        counts = summarize_delta(delta)
+        print(f"{rows:>10,} {seconds:>19.3f} {counts['added']:>8,} {counts['removed']:>8,} {counts['changed']:>8,}")
@@ -0,0 +1,52 @@
+"""Benchmark the HTML export reader: pd.read_html against ingest.read_html_table.
+
+    python benchmarks/bench_html.py [rows ...]
+
+Before timing, every export under files/ (inventory with the columns the app reads, 90-day sales
+whole) and a synthetic 90-day export are read both ways and must give equal frames, dtypes included.
+"""
+import sys, tempfile
+from functools import partial
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+from ingest import inventory_expected_columns, read_html_table
+from synth_data import inventory_rows, write_inventory_export, write_sales_export
+from _common import race
+
+def read_html_pandas(path, usecols=None):
+    """pd.read_html(path)[0], which read_html_table replaced in the parsers, cut to usecols."""
+    df = pd.read_html(path)[0]
+    return df if usecols is None else df[[col for col in df.columns if col in usecols]]
+
+def same_frame(path, old, new):
+    assert list(old.columns) == list(new.columns), (path, list(old.columns), list(new.columns))
+    assert old.dtypes.equals(new.dtypes), (path, old.dtypes[old.dtypes != new.dtypes])
+    assert old.equals(new), path
+
+def check_exports(paths):
+    """read_html_table against pd.read_html on each export, as the parsers call it."""
+    for path in paths:
+        usecols = None if path.stem.endswith('90') else inventory_expected_columns
+        same_frame(path, read_html_pandas(path, usecols), read_html_table(path, usecols))
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [2_000, 10_000]
+    exports = sorted((root / 'files').glob('*.xls'))
+    with tempfile.TemporaryDirectory() as tmp:
+        sales = Path(tmp) / 'Synthetic90.xls'
+        write_sales_export(sales, np.random.default_rng(0), 10)
+        check_exports(exports + [sales])
+        print(f"read_html_table matches pd.read_html on {len(exports) + 1} exports")
+
+        def export(rows):
+            path = Path(tmp) / f'Store_{rows}.xls'
+            write_inventory_export(path, inventory_rows(np.random.default_rng(0), rows, 'MODERN NISSAN OF CONCORD',
+                                                        np.datetime64('2026-05-01'), 0))
+            return path
+        race(sizes, export, partial(read_html_pandas, usecols=inventory_expected_columns),
+             partial(read_html_table, usecols=inventory_expected_columns), same_frame,
+             ('rows', 'read_html', 'read_html_table'))
@@ -0,0 +1,37 @@
+"""Benchmark the vectorized GOPTS → PACKAGE classifier against the original row-wise lambdas.
+
+    python benchmarks/bench_packages.py [rows ...]
+"""
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import classify_packages
+from _common import race
+
+def classify_packages_rowwise(gopts):
+    """load_data's row-wise lambdas, which classify_packages replaced."""
+    df = pd.DataFrame({'GOPTS': gopts})
+    df['Premium'] = df['GOPTS'].apply(lambda x: 'PRM' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['PRM', 'PR1', 'PR2', 'PR3']) else '')
+    df['Technology'] = df['GOPTS'].apply(lambda x: 'TECH' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['TEC', 'TE1', 'TE2', 'TE3']) else '')
+    df['Convenience'] = df['GOPTS'].apply(lambda x: 'CONV' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['CN1', 'CN2', 'CN3', 'CN4', 'CN5']) else '')
+    return df[['Premium', 'Technology', 'Convenience']].apply(lambda x: ' '.join(filter(None, x)), axis=1)
+
+def synthetic_gopts(rows, seed=0):
+    """Random GOPTS strings built from real option codes, with some NaNs."""
+    rng = np.random.default_rng(seed)
+    codes = np.array(['PRM', 'PR1', 'PR2', 'PR3', 'TEC', 'TE1', 'TE2', 'CN1', 'CN3', 'CN5',
+                      'FL2', 'IKP', 'MIR', 'SGD', 'USB', '50S', 'BAR', 'BUM', 'SG4', 'CAP'])
+    picks = rng.integers(0, len(codes), size=(rows, 6))
+    gopts = pd.Series([''.join(row) for row in codes[picks]], dtype=object)
+    gopts[rng.random(rows) < 0.05] = np.nan
+    return gopts
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000]
+    def same_packages(gopts, old, new):
+        assert old.astype(str).tolist() == new.astype(str).tolist(), "classifier output differs"
+    race(sizes, synthetic_gopts, classify_packages_rowwise, classify_packages, same_packages,
+         ('rows', 'row-wise', 'vectorized'))
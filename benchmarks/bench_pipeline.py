@@ -0,0 +1,224 @@
+"""Time every stage of the data pipeline on synthetic exports and write a machine-readable report.
+
+    python benchmarks/bench_pipeline.py [--rows 10000 100000] [--stores 4] [--repeat 3] [--narrow]
+                                        [--data DIR] [--out report.json] [--compare baseline.json]
+
+For each --rows size a fresh set of exports is generated (benchmarks/synth_data.py), or the exports
+already under --data DIR are used (e.g. --data . for the sample files). Each stage is the function
+the app runs, called directly without Streamlit's caches or the Parquet snapshots, in pipeline
+order, each on the output of the previous ones. Every stage runs --repeat times; the report holds
+the best and median wall time and the output row count per stage, plus the environment. With
+--memory each stage runs once more under tracemalloc, and the report adds the peak of the Python
+allocations made during the stage (peak_mb) and the memory held by its result (retained_mb);
+Arrow-backed string buffers are allocated outside Python and not counted.
+
+With --compare, each stage is checked against the same stage and size in an earlier report; the
+script exits with status 1 when one got slower than --threshold times its baseline.
+"""
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+import ingest, summaries
+from profiling import count_rows
+from synth_data import generate, known_stores
+
+# Stages whose baseline is shorter than this are too noisy to flag as regressions
+min_compared_seconds = 0.05
+
+def discover_exports(data_dir):
+    """The exports under data_dir, laid out like synth_data.generate's result."""
+    data_dir = Path(data_dir)
+    files = sorted((data_dir / 'files').glob('*.xls'))
+    names = {stem: name for stem, name, *_ in known_stores}
+    return {
+        'inventory': {f.stem: f for f in files if not f.stem.endswith('90')},
+        'sales90': {names.get(f.stem[:-2], f.stem[:-2]): f for f in files if f.stem.endswith('90')},
+        'cdk': data_dir / 'InventoryUpdate.xlsx',
+    }
+
+def traced_call(fn):
+    """Call fn() under tracemalloc; returns (result, peak MB allocated during the call, MB still held after it)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(peak / (1 << 20), 2), round(current / (1 << 20), 2)
+
+def run_stage(name, fn, repeat, rows=count_rows, memory=False):
+    """Call fn() repeat times (and once more traced, with memory); returns (result of the last call, report entry)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    entry = {
+        'stage': name,
+        'seconds_min': min(samples),
+        'seconds_median': statistics.median(samples),
+        'rows': rows(result),
+    }
+    if memory:
+        del result
+        result, entry['peak_mb'], entry['retained_mb'] = traced_call(fn)
+    return result, entry
+
+def bench_pipeline(paths, today, repeat=3, memory=False):
+    """Run the pipeline stage by stage on the exports in paths; returns the report entries in order."""
+    stages = []
+
+    def stage(name, fn, rows=count_rows):
+        result, entry = run_stage(name, fn, repeat, rows, memory)
+        stages.append(entry)
+        peak = f"  peak {entry['peak_mb']:>8.1f} MB" if memory else ''
+        print(f"  {name:<38} {entry['seconds_min']:>9.4f} s  {entry['rows']:>10,} rows{peak}")
+        return result
+
+    store_frames = stage('load_data', lambda: [ingest.parse_inventory_file(f) for f in paths['inventory'].values()])
+    if Path(paths['cdk']).exists():
+        stage('load_current_data', lambda: ingest.parse_current_inventory(paths['cdk']))
+    store_summaries = stage('process_90_day_sales', lambda: {
+        store: ingest.parse_90_day_file(f) for store, f in paths['sales90'].items()
+    })
+    combined_data = stage('build_combined_data', lambda: ingest.compact_inventory(
+        ingest.clean_dataframe_types(pd.concat(store_frames, ignore_index=True))
+    ))
+    # The app dedups each store at parse time; timed here on the combined frame so sizes compare
+    stage('latest_per_unit', lambda: ingest.latest_per_unit(combined_data))
+
+    start_of_month = pd.Timestamp(today.year, today.month, 1)
+    prepared = stage('prepare_incoming_frame', lambda: summaries.prepare_incoming_frame(combined_data),
+                     rows=lambda result: len(result[0]))
+    horizon = stage('summarize_incoming_horizon', lambda: summaries.summarize_incoming_horizon(prepared, start_of_month),
+                    rows=lambda result: len(result['cube']))
+    stage('summarize_incoming_horizon (26 weeks)',
+          lambda: summaries.summarize_incoming_horizon(prepared, pd.Timestamp(today), 26, 'W'),
+          rows=lambda result: len(result['cube']))
+    frame, all_models, all_dealers = prepared
+    stage('summarize_retailed_data', lambda: summaries.summarize_retailed_data(
+        combined_data, None, None, list(all_models), list(all_dealers)
+    ))
+    current_inventory = stage('summarize_current_inventory', lambda: summaries.summarize_current_inventory(store_summaries))
+    sales_long = stage('summarize_90_day_sales_by_store', lambda: summaries.summarize_90_day_sales_by_store(store_summaries))
+    formatted_sales = stage('format_90_day_sales', lambda: summaries.format_90_day_sales(sales_long))
+
+    pivots = [*horizon['incoming'], horizon['balance']]
+    visible = stage('incoming_tab_visible_models', lambda: summaries.incoming_tab_visible_models(
+        *pivots, formatted_sales, current_inventory
+    ), rows=len)
+    tables = stage('reindex_table_to_match_models', lambda: (
+        [summaries.reindex_table_to_match_models(p, visible, 'MDL') for p in pivots]
+        + [summaries.reindex_table_to_match_models(t, visible, 'Model') for t in (formatted_sales, current_inventory)]
+    ))
+    stage('render_html', lambda: ''.join(
+        [summaries.dataframe_to_html(p) for p in tables[:4]]
+        + [summaries.dataframe_to_html_90(t) for t in tables[4:]]
+        + [summaries.dataframe_to_html(horizon['cube'])]
+    ), rows=lambda html: html.count('<tr'))
+    return stages
+
+def check_missing_dates():
+    """A unit with no ETA is in no horizon bucket, and one with no DLV_DATE is not counted as delivered."""
+    frame = pd.DataFrame({
+        'DEALER_NAME': ['CON', 'CON', 'CON'],
+        'MDL': ['ROGUE', 'ROGUE', 'ROGUE'],
+        'ETA': pd.to_datetime(['2026-05-10', None, '2026-06-10']),
+        'DLV_DATE': pd.to_datetime([None, None, '2026-05-02']),
+    })
+    for freq, buckets in (('M', 3), ('W', 26)):
+        horizon = summaries.summarize_incoming_horizon((frame, ('ROGUE',), ('CON',)), pd.Timestamp('2026-05-01'), buckets, freq)
+        incoming = sum(pivot.loc['Total', 'Total'] for pivot in horizon['incoming'])
+        assert incoming == 2, (freq, incoming)
+        assert horizon['delivered'].loc['Total', 'Total'] == 1, (freq, horizon['delivered'])
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare(report, baseline, threshold):
+    """Print each stage's time against the baseline report; returns the stages that regressed."""
+    def by_key(rep):
+        return {(run['rows'], run['stores'], s['stage']): s['seconds_min'] for run in rep['runs'] for s in run['stages']}
+    old, new = by_key(baseline), by_key(report)
+    if baseline.get('params') != report['params']:
+        print(f"\nnote: the baseline ran with {baseline.get('params')}, this run with {report['params']}")
+    regressions = []
+    print(f"\n{'rows':>10} {'stage':<38} {'baseline (s)':>13} {'now (s)':>10} {'ratio':>7}")
+    for key, seconds in new.items():
+        if key not in old:
+            continue
+        ratio = seconds / old[key] if old[key] else float('inf')
+        flag = ratio > threshold and old[key] >= min_compared_seconds
+        if flag:
+            regressions.append(key)
+        rows = f"{key[0]:,}" if key[0] is not None else 'data'
+        print(f"{rows:>10} {key[2]:<38} {old[key]:>13.4f} {seconds:>10.4f} {ratio:>6.2f}x{'  SLOWER' if flag else ''}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--stores', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--today', default=None, help='anchor date for the generated data and the Incoming windows')
+    parser.add_argument('--narrow', action='store_true', help='generate only the inventory columns the app reads')
+    parser.add_argument('--data', default=None, help='benchmark the exports under this directory instead')
+    parser.add_argument('--memory', action='store_true', help='also record the traced peak memory of every stage')
+    parser.add_argument('--out', default='bench_pipeline.json')
+    parser.add_argument('--compare', default=None, help='earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args()
+
+    check_missing_dates()
+    today = pd.Timestamp(args.today or datetime.now().date())
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'params': {'repeat': args.repeat, 'seed': args.seed, 'today': today.date().isoformat(), 'narrow': args.narrow,
+                   'memory': args.memory},
+        'runs': [],
+    }
+    if args.data:
+        print(f"exports under {args.data}")
+        runs = [(None, None, discover_exports(args.data))]
+    else:
+        runs = [(rows, args.stores, None) for rows in args.rows]
+    for rows, stores, paths in runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            if paths is None:
+                print(f"{rows:,} rows, {stores} stores: generating exports ...")
+                started = time.perf_counter()
+                paths = generate(tmp, rows, stores, seed=args.seed, today=today.date(), narrow=args.narrow)
+                print(f"  generated in {time.perf_counter() - started:.1f} s")
+            stages = bench_pipeline(paths, today, args.repeat, args.memory)
+            report['runs'].append({
+                'rows': rows, 'stores': stores,
+                'input_bytes': sum(Path(p).stat().st_size for kind in ('inventory', 'sales90') for p in paths[kind].values())
+                               + (Path(paths['cdk']).stat().st_size if Path(paths['cdk']).exists() else 0),
+                'stages': stages,
+            })
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nreport written to {args.out}")
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) more than {args.threshold:.2f}x slower than the baseline")
+            sys.exit(1)
@@ -0,0 +1,32 @@
+"""Measure Streamlit rerun latency of the app with AppTest (no browser needed).
+
+    python benchmarks/bench_rerun.py [reruns]
+
+Times the first run, then the rerun triggered by changing the All Stores model filter, which
+is the interaction users repeat most. Run it on two checkouts to compare before/after.
+"""
+import os, statistics, sys, time
+from pathlib import Path
+from streamlit.testing.v1 import AppTest
+
+root = Path(__file__).resolve().parent.parent
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    os.chdir(root)
+    at = AppTest.from_file(str(root / 'main.py'), default_timeout=600)
+    first = timed_run(at)
+    options = at.selectbox(key='all_model').options
+    samples = []
+    for i in range(reruns):
+        at.selectbox(key='all_model').select(options[1 + i % (len(options) - 1)])
+        samples.append(timed_run(at))
+    print(f"first run:                 {first * 1000:8.1f} ms")
+    print(f"model filter rerun median: {statistics.median(samples) * 1000:8.1f} ms  (n={reruns})")
+    print(f"model filter rerun max:    {max(samples) * 1000:8.1f} ms")
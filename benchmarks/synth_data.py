@@ -0,0 +1,257 @@
+"""Generate synthetic dealer exports at any scale, laid out like the app's working directory.
+
+    python benchmarks/synth_data.py OUT_DIR [--rows 100000] [--stores 4] [--cdk-rows N] [--seed 0] [--today YYYY-MM-DD] [--narrow]
+
+Writes OUT_DIR/files/<Store>.xls (inventory export), OUT_DIR/files/<Store>90.xls (90-day sales)
+and OUT_DIR/InventoryUpdate.xlsx (CDK) in the same HTML / workbook layouts as the real exports,
+so the ingest parsers, benchmarks/bench_pipeline.py or `streamlit run main.py` (from OUT_DIR) can
+load them. --rows is the inventory row count over all stores; about 2% of the rows repeat a unit
+with a different ETA, as re-ordered units do in the real exports. The real inventory export is
+~3 KB per row (88 columns); --narrow writes only the 18 columns the app reads, about a quarter of
+that, which keeps multi-million-row files manageable.
+"""
+import argparse, sys
+from datetime import date
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import ext_mapping, mdl_mapping, inventory_expected_columns
+
+# (file stem, 90-day store name, DEALER_NAME, CDK company) for the four real stores; any further
+# stores get made-up names
+known_stores = [
+    ('Concord', 'Concord', 'MODERN NISSAN OF CONCORD', 3),
+    ('Winston', 'Winston-Salem', 'MODERN NISSAN, LLC', 2),
+    ('Lake', 'Lake Norman', 'MODERN NISSAN/LAKE NORMAN', 6),
+    ('Hickory', 'Hickory', 'MODERN NISSAN OF HICKORY', 11),
+]
+
+# Every column of the real inventory export, in order; the ones not generated below are left blank
+inventory_export_columns = [
+    'RGN', 'SRG', 'AREA', 'DIST', 'POE', 'VPC', 'OEM', 'LOC', 'LOC_DESC', 'DLRORD', 'VOT', 'MDL', 'MDLYR',
+    'MCODE', 'PREFIX', 'SERIAL', 'VIN', 'OPTS', 'FOPTS', 'GOPTS', 'VOPTS', 'VPC_DLRNET', 'EXT', 'INT', 'EMIS',
+    'LIT', 'ASGN', 'CURDLR', 'DEALER_NAME', 'DLR_ST_CD', 'WHSDLR', 'TRM_LVL', 'BDY_STY', 'DRV_TRN', 'FIRM_DT',
+    'ASSGN_DT', 'MANU_DT', 'NNARCPT', 'XFR_SHP_DTE', 'XFR_RCP_DT', 'MONRONEY', 'INV_DT', 'DRAFT_DT', 'YARDEXIT',
+    'DLRETA', 'PRICECD', 'CUSTORDER', 'ORD_CUST_NAME', 'ORD_CUST_ADDR', 'ORD_CUST_CITY', 'ORD_CUST_ST',
+    'ORD_CUST_ZIP', 'ORD_CUST_EMAIL_ADDR', 'ORD_CUST_DATE', 'DLR_XFR_DT', 'DLRDAYS', 'LINE_OF_BUS', 'VESSEL',
+    'DLR_DLV_DT', 'DSHP_DLR', 'DSHP_NAME', 'DSHP_ADDR', 'DSHP_CITY', 'DSHP_ST', 'DSHP_ZIP', 'DLR_INVOICE', 'MSRP',
+    'DNH', 'MKTG_ASSMT', 'WCR', 'RTL_RGN', 'RTL_DIST', 'RTL_DLR', 'RTL_SALETYPE', 'RTL_SALE_DT', 'RTL_ADD_DT',
+    'CUST_NAME', 'CUST_ADDRESS', 'CUST_CITY', 'CUST_STATE', 'CUST_ZIP', 'RTL_DLR_NAME', 'CUST_EMAIL_ADDR',
+    'RDR_SLS_TYP_CD', 'RDR_USER_ID', 'MCO_CERT', 'MCO_PRINT_DT',
+]
+
+# Model code → share of the units, roughly the mix of the sample exports
+model_mix = {'RGE': 0.30, 'PTH': 0.16, '720': 0.15, 'NKX': 0.12, 'SEN': 0.10, 'MUR': 0.07,
+             'ARM': 0.03, 'ALT': 0.03, 'VSD': 0.02, 'ARI': 0.01, 'Z': 0.01}
+locations = {'DLR INV': 0.65, 'PNS': 0.20, 'RETAILED': 0.08, 'SIT': 0.05, 'NNA INV': 0.02}
+trims = ['S', 'SV', 'SL', 'SR', 'PLATI', 'PLAT', 'PRO4X', 'DA']
+drives = ['FWD', 'AWD', '2WD', '4WD', 'RWD']
+interiors = list('GKCZYBXR')
+option_codes = ['PRM', 'PR1', 'PR2', 'PR3', 'TEC', 'TE1', 'TE2', 'CN1', 'CN3', 'CN5', 'FL2', 'FL3', 'IKP',
+                'MIR', 'SGD', 'USB', '50S', 'BAR', 'BUM', 'SG4', 'CAP', 'PNT', 'MYC', 'CAR', 'RET', 'CLD']
+vin_prefixes = ['JN8BT3DD', '5N1BT3BB', '1N4BL4DV', 'JN8AY3BA', '5N1DR3BT', '3N1AB8CV', '1N6ED1EK']
+# 90-day sales model lines as the export spells them (aliases included)
+sales_model_lines = ['PTHFINDR', 'SENTRA', 'ROGUE', 'N KICKS', 'VSD', 'ALTIMA', 'MURANO', 'ARMADA', 'FRONTIER',
+                     'LEAF', 'Z COUPE', 'KICKS', 'RGE PHEV', 'TITAN', 'ARIYA']
+cdk_model_names = {code: name for name, code in mdl_mapping.items()} | {'NKX': 'KICKS', 'ARI': 'ARIYA', 'Z': 'Z'}
+
+def store_layout(stores):
+    """The first `stores` (stem, sales name, dealer name, company) tuples, padded with made-up stores."""
+    layout = known_stores[:stores]
+    for i in range(len(layout) + 1, stores + 1):
+        layout.append((f'Store{i}', f'Store {i}', f'MODERN NISSAN STORE {i}', 20 + i))
+    return layout
+
+def _pick(rng, choices, size):
+    if isinstance(choices, dict):
+        p = np.array(list(choices.values()), dtype=float)
+        return np.array(list(choices), dtype=object)[rng.choice(len(choices), size=size, p=p / p.sum())]
+    return np.array(choices, dtype=object)[rng.integers(0, len(choices), size=size)]
+
+def _dates(today, offsets, filled):
+    """ISO date strings today + offsets days, '' where not filled."""
+    days = (np.datetime64(today, 'D') + offsets.astype('timedelta64[D]')).astype(str).astype(object)
+    return np.where(filled, days, '')
+
+def inventory_rows(rng, rows, dealer, today, first_unit=0):
+    """Column name → array of cell texts for one store's inventory export."""
+    repeats = rows // 50  # ~2% repeated units (same VIN/order, another ETA)
+    n_units = max(rows - repeats, 1)
+    local = np.concatenate([np.arange(rows - repeats), rng.integers(0, n_units, size=repeats)])[rng.permutation(rows)]
+    units = local + first_unit
+
+    def per_unit(values):
+        # Attributes of the unit itself (model, VIN, ...) are drawn per unit so its repeated rows agree
+        return values[local]
+
+    mdl = per_unit(_pick(rng, model_mix, n_units))
+    loc = per_unit(_pick(rng, locations, n_units))
+    model_ids = pd.factorize(mdl)[0]
+    mcode = (21016 + model_ids * 3100 + per_unit(rng.integers(0, 6, size=n_units)) * 100).astype(str)
+    serial = per_unit(rng.integers(0, 1_000_000, size=n_units))
+    vin = np.char.add(np.char.add(per_unit(_pick(rng, vin_prefixes, n_units)).astype(str), 'TW'),
+                      np.char.zfill(serial.astype(str), 7))
+    no_vin = (loc == 'PNS') & (rng.random(rows) < 0.9)
+    order = np.char.add(per_unit(_pick(rng, ['XT', 'VN', 'QH', 'XU'], n_units)).astype(str),
+                        np.char.zfill((units % 100_000).astype(str), 5))
+    ext_codes = list(ext_mapping) + ['ZZZ', 'QQQ']  # a few codes ext_mapping doesn't know
+    opts = _pick(rng, option_codes, (rows, 5))
+    eta = _dates(today, rng.integers(-60, 150, size=rows), np.ones(rows, dtype=bool))
+    eta = np.where(rng.random(rows) < 0.01, '2098-12-31', eta)  # placeholder ETA on unscheduled orders
+    delivered = np.isin(loc, ['DLR INV', 'RETAILED']) & (rng.random(rows) < 0.55)
+    ordered = np.isin(loc, ['PNS', 'SIT']) & (rng.random(rows) < 0.25)
+    customer = np.char.add('CUSTOMER ', units.astype(str))
+    return {
+        'LOC': _pick(rng, ['DLR', 'NNA', 'PORT'], rows),
+        'LOC_DESC': loc,
+        'DLRORD': order,
+        'VOT': _pick(rng, ['DR', 'DS', 'FL'], rows),
+        'MDL': mdl,
+        'MDLYR': _pick(rng, {'20260': 0.95, '20250': 0.04, '20270': 0.01}, rows),
+        'MCODE': mcode,
+        'VIN': np.where(no_vin, '', vin),
+        'GOPTS': np.array([''.join(row) for row in opts], dtype=object),
+        'EXT': _pick(rng, ext_codes, rows),
+        'INT': _pick(rng, interiors, rows),
+        'DEALER_NAME': np.full(rows, dealer, dtype=object),
+        'TRM_LVL': _pick(rng, trims, rows),
+        'DRV_TRN': _pick(rng, drives, rows),
+        'DLRETA': eta,
+        'ORD_CUST_NAME': np.where(ordered, customer, ''),
+        'ORD_CUST_EMAIL_ADDR': np.where(ordered, np.char.add(np.char.lower(np.char.replace(customer, ' ', '.')), '@example.com'), ''),
+        'ORD_CUST_DATE': _dates(today, -rng.integers(0, 90, size=rows), ordered),
+        'DLR_DLV_DT': _dates(today, -rng.integers(0, 200, size=rows), delivered),
+        'MSRP': rng.integers(22_000, 72_000, size=rows).astype(str),
+        'RTL_SALE_DT': _dates(today, -rng.integers(0, 30, size=rows), loc == 'RETAILED'),
+    }
+
+def write_inventory_export(path, columns, narrow=False, chunk_rows=50_000):
+    """Write the columns (name → cell texts) as an inventory export: one HTML table, <th> header.
+
+    All export columns are written (blank where not generated), or with narrow only the ones the
+    inventory parser reads.
+    """
+    header = [col for col in inventory_export_columns if not narrow or col in inventory_expected_columns]
+    cells = ''.join(
+        '     <td align="center">{} </td>\n' if col in columns else '     <td align="center"> </td>\n'
+        for col in header
+    )
+    template = '   <tr>\n' + cells + '   </tr>\n'
+    ordered = [col for col in header if col in columns]
+    values = [np.asarray(columns[col], dtype=object).tolist() for col in ordered]
+    rows = len(values[0])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN" '
+                '"http://www.w3.org/TR/html4/loose.dtd">\n\n<table border="1" bordercolor="#000000">\n   <tr>\n')
+        f.write(''.join(f'    <th align="center">{col}</th>\n' for col in header))
+        f.write('   </tr>\n')
+        for start in range(0, rows, chunk_rows):
+            chunk = zip(*(column[start:start + chunk_rows] for column in values))
+            f.write(''.join(template.format(*row) for row in chunk))
+        f.write('</table>\n')
+
+def write_sales_export(path, rng, scale):
+    """Write a 90-day sales export: two header rows (rowspan/colspan), one row per model line, TOTAL."""
+    header = (
+        '    <tr>\n' + ''.join(f'      <td rowspan="2" bgcolor="#bebebe">{name}</td>\n' for name in [
+            'Model Line:<br/>', 'Units Sold Rolling Days 90', 'Units Sold-MTD', 'Dlr Invoice',
+            'Dlr Inventory', 'Dlr Days Supply**'])
+        + '      <td colspan="3" bgcolor="#bebebe">Wholesale to Retail (avg.days)</td>\n'
+        + '      <td colspan="3" bgcolor="#bebebe">Wholesale to Retail (Ranking)</td>\n    </tr>\n    <tr>\n'
+        + ''.join(f'      <td bgcolor="#bebebe">{name}</td>\n' for name in ['Dealer', 'District', 'Region'] * 2)
+        + '    </tr>\n'
+    )
+    lines = rng.permutation(sales_model_lines)
+    sold = rng.integers(0, max(int(60 * scale), 2), size=len(lines))
+    table = np.column_stack([
+        sold, sold // 15, rng.integers(0, 10, size=len(lines)), rng.integers(0, max(int(40 * scale), 2), size=len(lines)),
+        rng.integers(10, 220, size=len(lines)), rng.integers(10, 200, size=(len(lines), 3)),
+        np.tile(np.arange(1, len(lines) + 1)[:, None], 3),
+    ]).astype(object)
+    table[sold == 0, 4:] = 'N/A'
+    total = ['TOTAL', sold.sum(), (sold // 15).sum(), table[:, 2].sum(), table[:, 3].sum()] + ['N/A'] * 7
+    body = ''.join(
+        '    <tr>\n' + ''.join(f'      <td align="right" height="19" class="OMS_TableContents">\n        {cell}\n      </td>\n'
+                               for cell in [name, *values]) + '    </tr>\n'
+        for name, *values in [[line, *row] for line, row in zip(lines, table)] + [total]
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0 Transitional//EN">\n\n  <!-- Sales by Model Line -->\n'
+                '<table border="1" cellpadding="5" cellspacing="0" id="AutoNumber1">\n  <tbody>\n')
+        f.write(header + body + '  </tbody>\n</table>\n')
+
+def write_cdk_workbook(path, rng, rows, layout):
+    """Write InventoryUpdate.xlsx: four filter-criteria rows, then the vehicle list from column B."""
+    if rows > 1_048_576 - 5:
+        raise ValueError("an .xlsx sheet holds at most 1,048,571 vehicle rows")
+    models = _pick(rng, model_mix, rows)
+    ext = _pick(rng, list(ext_mapping), rows)
+    company = _pick(rng, [str(co) for *_, co in layout], rows)
+    stock = np.char.add(np.char.add(company.astype(str), 'N'), rng.integers(1000, 9999, size=rows).astype(str))
+    balance = np.round(rng.uniform(18_000, 80_000, size=rows), 2)
+    balance_missing = rng.random(rows) < 0.1
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Vehicle List')
+    ws.append(['Inventory Filter Criteria'])
+    ws.append(['Stock Type:', 'New', 'Status:', 'S,H', 'Exclude Wholesale:', 'Yes', 'Model Type:'])
+    ws.append(['Age:', None, 'Companies:', ','.join(str(co) for *_, co in layout), 'GL Accounts:'])
+    ws.append([])
+    ws.append([None, 'Stock\nNo.', 'Year', 'Make', 'Model', 'Model\nNo.', 'Color', 'Lot', 'Co.', 'Age', 'Status',
+               'VIN', 'Deal \nNo.', 'Balance', 'Custom Vehicle Field1'])
+    lots = ['', '', '', 'CONCORD', 'HICKORY', 'WINSTON', 'LAKE', 'LKN']
+    customs = ['', '', '', '', 'FROM #3', 'FROM #11', 'GRAND STRAND', 'DAMAGED']
+    columns = zip(
+        stock.tolist(), _pick(rng, ['2026', '2025'], rows).tolist(), [cdk_model_names.get(m, m) for m in models],
+        rng.integers(21016, 56016, size=rows).astype(str).tolist(),
+        [f"{code}/{ext_mapping[code][:10]}" for code in ext], _pick(rng, lots, rows).tolist(), company.tolist(),
+        rng.integers(0, 365, size=rows).tolist(), _pick(rng, {'S': 0.99, 'H': 0.01}, rows).tolist(),
+        np.char.add('5N1BT3BB5TC', np.char.zfill(np.arange(rows).astype(str), 6)).tolist(),
+        np.where(balance_missing, None, balance).tolist(), _pick(rng, customs, rows).tolist(),
+    )
+    for stock_no, year, model, mcode, color, lot, co, age, status, vin, bal, custom in columns:
+        ws.append([None, stock_no, year, 'NISS', model, mcode, color, lot, co, age, status, vin, '', bal, custom])
+    wb.save(path)
+
+def generate(out_dir, rows=100_000, stores=4, cdk_rows=None, seed=0, today=None, narrow=False):
+    """Write a full set of synthetic exports under out_dir; returns the paths, like main.py lays them out.
+
+    {'inventory': {stem: path}, 'sales90': {store name: path}, 'cdk': path}
+    """
+    out_dir = Path(out_dir)
+    (out_dir / 'files').mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(today or date.today(), 'D')
+    layout = store_layout(stores)
+    per_store = np.full(stores, rows // stores)
+    per_store[:rows % stores] += 1
+    paths = {'inventory': {}, 'sales90': {}, 'cdk': out_dir / 'InventoryUpdate.xlsx'}
+    first_unit = 0
+    for (stem, sales_name, dealer, _), store_rows in zip(layout, per_store):
+        path = out_dir / 'files' / f'{stem}.xls'
+        write_inventory_export(path, inventory_rows(rng, int(store_rows), dealer, today, first_unit), narrow)
+        first_unit += int(store_rows)
+        paths['inventory'][stem] = path
+        sales_path = out_dir / 'files' / f'{stem}90.xls'
+        write_sales_export(sales_path, rng, max(store_rows / 300, 1))
+        paths['sales90'][sales_name] = sales_path
+    cdk_rows = min(rows // 2, 1_048_571) if cdk_rows is None else cdk_rows
+    write_cdk_workbook(paths['cdk'], rng, cdk_rows, layout)
+    return paths
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=100_000, help='inventory rows over all stores')
+    parser.add_argument('--stores', type=int, default=4)
+    parser.add_argument('--cdk-rows', type=int, default=None, help='CDK workbook rows (default rows / 2)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--today', default=None, help='date the ETAs and delivery dates are spread around')
+    parser.add_argument('--narrow', action='store_true', help='only the inventory columns the app reads')
+    args = parser.parse_args()
+    paths = generate(args.out_dir, args.rows, args.stores, args.cdk_rows, args.seed, args.today, args.narrow)
+    for kind, files in paths.items():
+        for path in (files.values() if isinstance(files, dict) else [files]):
+            print(f"{kind:>9}  {path}  ({Path(path).stat().st_size / 1e6:,.1f} MB)")
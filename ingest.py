@@ -0,0 +1,636 @@
+"""Readers and cleanup for the dealer inventory, 90-day sales and CDK exports; prefetch_sources parses changed files in worker processes."""
+import multiprocessing, os, posixpath, re, threading, time, warnings, zipfile
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from lxml import etree
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+from pandas.io.parsers import TextParser
+import snapshot_cache
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
+
+if int(pd.__version__.split('.')[0]) < 3:
+    # Always on from pandas 3: frames derived from another share its columns until either is
+    # modified, so the parsers and summaries never need defensive copies
+    pd.set_option('mode.copy_on_write', True)
+
+ext_mapping = {
+    'A20': 'RED ALERT', 'B51': 'ELECTRIC BLUE', 'BW5': 'HERMOSA BLUE', 'CAS': 'MOCHA ALMOND',
+    'CBF': 'CANYON BRONZE', 'XLC': 'GUN/RED', 'XLE': 'YELLOW/BLACK', 'XLD': 'ICE/BLACK',
+    'DAN': 'OBSIDIAN GREEN', 'DAQ': 'TACTICAL GREEN', 'EBB': 'MONARCH ORANGE', 'EBL': 'SUNSET DRIFT',
+    'G41': 'MAGNETIC BLACK', 'GAQ': 'GRAY/BLACK ROOF', 'HAL': 'BAJA STORM', 'K23': 'BRILLIANT SILVER',
+    'KAD': 'GUN METALLIC', 'KAY': 'CHAMPAGNE SILVER', 'KBY': 'BOULDER GRAY', 'KCH': 'ETHOS GRAY',
+    'KH3': 'SUPER BLACK', 'NAW': 'COULIS RED', 'NBL': 'SCARLET EMBER', 'NBQ': 'ROSEWOOD',
+    'NBY': 'CARDINAL RED', 'QAB': 'PEARL WHITE', 'QAC': 'ASPEN WHITE', 'QAK': 'GLACIER WHITE',
+    'QM1': 'FRESH POWDER', 'RAY': 'DEEP BLUE PEARL', 'RBD': 'STORM BLUE', 'RBY': 'CASPIAN BLUE',
+    'RCJ': 'DEEP OCEAN BLUE', 'XAB': 'WHITE/BLACK', 'XAH': 'ORANGE/BLACK', 'XBJ': 'WHITE/BLACK',
+    'XDU': 'RED/BLACK', 'XEU': 'BLUE/BLACK', 'XEW': 'CHAMP/BLACK', 'XEX': 'GRAY/BLACK',
+    'XFN': 'GREEN/BLACK', 'XGY': 'BLUE/BLACK', 'XKV': 'TAN/BLACK', 'XEV': 'ORANGE/BLACK',
+    'DAP': 'NORTHERN LIGHTS', 'GAT': 'BLACK DIAMOND', 'XGA': 'WHITE/BLACK', 'XGB': 'SILVER/BLACK',
+    'XGD': 'RED/BLACK', 'XGH': 'GRAY/BLACK', 'XGJ': 'COPPER/BLACK', 'XGU': 'BLUE/BLACK',
+    'NCA': 'BURGUNDY', 'QBE': 'EVEREST WHITE', 'KBZ': 'ATLANTIC GRAY', 'XKY': 'ATLANTIC/BLACK',
+    'XKJ': 'EVEREST/BLACK', 'RCF': 'BLUESTONE PEARL', 'XHQ': 'DEEP OCEAN/BLACK', 'XJR': 'SEIRAN BLUE/BLACK',
+    'XHN': 'BLU/GRAY', 'XHN': 'BLUE/GRAY', 'ECG': 'ORANGE', 'ECD': 'ORANGE', 'DAR': 'ALPINE',
+    'XKN': 'AURORA/BLACK', 'FAN': 'AURORA', 'KCF': 'CHAMPAGNE', 'XLW': 'ALPINE/BLACK',
+    'XBF': 'SILVER/BLACK', 'YCU': 'RED/BLACK',
+}
+mdl_mapping = {
+    'ALTIMA': 'ALT', 'ARMADA': 'ARM', 'FRONTIER': '720', 'KICKS': 'KIX', 'LEAF ELECTRIC': 'LEF',
+    'MURANO': 'MUR', 'PATHFINDER': 'PTH', 'ROGUE': 'RGE', 'SENTRA': 'SEN', 'TITAN': 'TTN',
+    'VERSA': 'VSD', 'Z NISMO': 'Z', 'Z PROTO': 'Z'
+}
+
+dealer_acronyms = {
+    'MODERN NISSAN OF CONCORD': 'CONCORD', 'MODERN NISSAN OF HICKORY': 'HICKORY',
+    'MODERN NISSAN, LLC': 'WINSTON', 'MODERN NISSAN/LAKE NORMAN': 'LAKE'
+}
+
+reverse_mdl_mapping = {'ALT': 'ALTIMA', 'ARM': 'ARMADA', '720': 'FRONTIER', 'KIX': 'KICKS', 'LEF': 'LEAF',
+    'MUR': 'MURANO', 'PTH': 'PATHFINDER', 'RGE': 'ROGUE', 'SEN': 'SENTRA', 'TTN': 'TITAN', 'VSD': 'VERSA',
+    'ARI': 'ARIYA', 'TXD': 'TITAN XD'}
+
+# Aliases so variants collapse to one row with the canonical name
+model_canonical_aliases = {
+    'PTHFINDR': 'PATHFINDER',
+    'NKX': 'KICKS',
+    'N KICKS': 'KICKS',
+    'Z COUPE': 'Z',
+    'VSD': 'VERSA',
+}
+
+@lru_cache(maxsize=None)
+def norm_canonical_model(m):
+    """Normalize model name: apply code→full name, then alias→canonical (e.g. PTHFINDR→PATHFINDER, NKX→KICKS)."""
+    s = str(m).strip().upper()
+    s = reverse_mdl_mapping.get(s, s)
+    s = model_canonical_aliases.get(s, s)
+    return s
+
+def map_unique(values, mapper):
+    """Map a Series through mapper (a dict or a function) once per distinct value.
+
+    The mapped categories are broadcast back through the category codes, so the cost grows with
+    the number of distinct values, not rows. Missing values stay missing and a dict leaves values
+    it doesn't list unchanged, like Series.replace.
+    """
+    cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+    lookup = mapper.get if isinstance(mapper, dict) else None
+    mapped = [lookup(v, v) if lookup else mapper(v) for v in cat.cat.categories]
+    table = np.array(mapped + [np.nan], dtype=object)  # code -1 (missing) picks the trailing NaN
+    result = pd.Series(table[cat.cat.codes.to_numpy()], index=values.index, name=values.name)
+    return result.astype('category' if values is cat else values.dtype)
+
+# Option-code → package rules, in display order. A unit gets a package label when any of its
+# codes appears anywhere in the GOPTS string.
+package_rules = [
+    ('PRM', ('PRM', 'PR1', 'PR2', 'PR3')),
+    ('TECH', ('TEC', 'TE1', 'TE2', 'TE3')),
+    ('CONV', ('CN1', 'CN2', 'CN3', 'CN4', 'CN5')),
+]
+_package_patterns = [re.compile('|'.join(map(re.escape, codes))) for _, codes in package_rules]
+# Label for every combination of matched rules, indexed by the bitmask of matches
+_package_labels = np.array([
+    ' '.join(label for bit, (label, _) in enumerate(package_rules) if combo >> bit & 1)
+    for combo in range(1 << len(package_rules))
+], dtype=object)
+
+def classify_packages(gopts: pd.Series) -> pd.Series:
+    """Map each GOPTS string to its PACKAGE label (e.g. 'PRM TECH'); non-strings map to ''."""
+    codes, uniques = pd.factorize(gopts, sort=False)
+    uniques = pd.Series(uniques, dtype=object)
+    is_text = uniques.map(type).eq(str).to_numpy()
+    combo = np.zeros(len(uniques), dtype=np.intp)
+    text = uniques[is_text]
+    for bit, pattern in enumerate(_package_patterns):
+        hits = np.zeros(len(uniques), dtype=bool)
+        hits[is_text] = text.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+        combo |= hits.astype(np.intp) << bit
+    labels = np.append(_package_labels[combo], '')  # factorize marks NaN as -1
+    return pd.Series(labels[codes], index=gopts.index, dtype=object)
+
+_text_of = etree.XPath('string()')
+_has_spans = etree.XPath('boolean(./td[@rowspan or @colspan] | ./th[@rowspan or @colspan])')
+_has_style = etree.XPath('boolean(./td[@style] | ./th[@style])')
+_whitespace = re.compile(r"[\r\n]+|\s{2,}")
+
+def _is_hidden(elem):
+    return 'display:none' in (elem.get('style') or '').replace(' ', '')
+
+def _cell_text(td):
+    text = td.text if len(td) == 0 else _text_of(td)
+    return _whitespace.sub(' ', text.strip()) if text else ''
+
+def _expand_spans(cells, remainder):
+    """Expand one row's (text, rowspan, colspan) cells the way read_html does.
+
+    remainder carries cells from earlier rows whose rowspan reaches into this one; returns
+    (texts, next_remainder).
+    """
+    texts, next_remainder, index = [], [], 0
+    for text, rowspan, colspan in cells:
+        while remainder and remainder[0][0] <= index:
+            prev_i, prev_text, prev_rowspan = remainder.pop(0)
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+            index += 1
+        for _ in range(colspan):
+            texts.append(text)
+            if rowspan > 1:
+                next_remainder.append((index, text, rowspan - 1))
+            index += 1
+    for prev_i, prev_text, prev_rowspan in remainder:
+        texts.append(prev_text)
+        if prev_rowspan > 1:
+            next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+    return texts, next_remainder
+
+def _span_cells(tds):
+    return [(_cell_text(td), int(td.get('rowspan') or 1), int(td.get('colspan') or 1)) for td in tds]
+
+def read_html_table(file_path, usecols=None):
+    """Stream the first table of an HTML export into a DataFrame, like pd.read_html(file_path)[0].
+
+    The dealer ".xls" files are HTML. Rows are read with lxml.etree.iterparse and freed as soon as
+    they are seen, so the full DOM is never built; with usecols only those header columns are kept,
+    and only their cells' text is extracted. Header detection, colspan/rowspan expansion and type
+    inference (thousands=',') follow read_html.
+    """
+    header, body, footer = [], [], []
+    remainder, keep = [], None
+    table_depth, section, has_text, seen_thead = 0, None, False, False
+
+    def pick(texts):
+        return texts if keep is None else [texts[i] if i < len(texts) else '' for i in keep]
+
+    for event, elem in etree.iterparse(file_path, events=('start', 'end'), html=True, huge_tree=True,
+                                       tag=('table', 'thead', 'tbody', 'tfoot', 'tr')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == 'table':
+                table_depth += 1
+            elif table_depth == 1 and tag != 'tr':
+                section = tag
+            continue
+        if tag == 'table':
+            table_depth -= 1
+            if table_depth == 0:
+                if has_text:
+                    break
+                # read_html skips tables without any text
+                header, body, footer, remainder, keep = [], [], [], [], None
+                section, seen_thead = None, False
+            continue
+        if table_depth != 1:
+            continue
+        if tag != 'tr':
+            section = None
+            continue
+        if not _is_hidden(elem):
+            tds = [td for td in elem if td.tag in ('td', 'th')]
+            if _has_style(elem):
+                tds = [td for td in tds if not _is_hidden(td)]
+            seen_thead = seen_thead or section == 'thead'
+            if section == 'tfoot':
+                footer.append(_span_cells(tds))
+            elif section == 'thead' or (not seen_thead and not body and all(td.tag == 'th' for td in tds)):
+                # Without a <thead>, leading all-<th> rows are the header
+                texts, remainder = _expand_spans(_span_cells(tds), remainder)
+                has_text = has_text or any(texts)
+                header.append(texts)
+            else:
+                if not body and usecols is not None and len(header) == 1:
+                    names = header[0]
+                    keep = [names.index(col) for col in dict.fromkeys(names) if col in usecols]
+                    header[0] = pick(names)
+                if remainder or _has_spans(elem):
+                    texts, remainder = _expand_spans(_span_cells(tds), remainder)
+                    texts = pick(texts)
+                elif keep is None:
+                    texts = [_cell_text(td) for td in tds]
+                else:
+                    texts = [_cell_text(tds[i]) if i < len(tds) else '' for i in keep]
+                has_text = has_text or any(texts)
+                body.append(texts)
+        # Free the row (and anything before it) as we go
+        elem.clear()
+        parent = elem.getparent()
+        while parent is not None and elem.getprevious() is not None:
+            del parent[0]
+
+    if not has_text:
+        raise ValueError("No tables found")
+    for cells in footer:
+        texts, remainder = _expand_spans(cells, remainder)
+        body.append(pick(texts))
+    while remainder:
+        texts, next_remainder = [], []
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        body.append(pick(texts))
+        remainder = next_remainder
+
+    rows = header + body
+    width = max(len(row) for row in rows)
+    rows = [row if len(row) == width else row + [''] * (width - len(row)) for row in rows]
+    if len(header) == 1:
+        header_arg = 0
+    elif header:
+        header_arg = [i for i, row in enumerate(header) if any(text for text in row)]
+    else:
+        header_arg = None
+    with TextParser(rows, header=header_arg, thousands=',') as parser:
+        return parser.read()
+
+_xl = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_xl_rel_id = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+@lru_cache(maxsize=None)
+def _column_number(letters):
+    """1-based column of column letters ('B' → 2)."""
+    number = 0
+    for ch in letters.upper():
+        number = number * 26 + ord(ch) - 64
+    return number
+
+def _xlsx_text(elem):
+    """Text of a shared or inline string: its <t> and rich-text runs, without phonetic runs."""
+    if len(elem) == 1 and elem[0].tag == f'{_xl}t':
+        return elem[0].text or ''
+    return ''.join(t.text or '' for t in elem.iter(f'{_xl}t') if t.getparent().tag != f'{_xl}rPh')
+
+def _xlsx_first_sheet(archive):
+    """Archive path of the workbook's first worksheet, and the workbook's date epoch."""
+    workbook = etree.fromstring(archive.read('xl/workbook.xml'))
+    rel_id = workbook.find(f'{_xl}sheets/{_xl}sheet').get(_xl_rel_id)
+    rels = etree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    target = next(rel.get('Target') for rel in rels if rel.get('Id') == rel_id)
+    path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+    props = workbook.find(f'{_xl}workbookPr')
+    date1904 = props is not None and props.get('date1904', '').lower() in ('1', 'true')
+    return path, MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+def _xlsx_shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as f:
+        for _, si in etree.iterparse(f, tag=f'{_xl}si', huge_tree=True):
+            strings.append(_xlsx_text(si))
+            si.clear()
+            while si.getprevious() is not None:
+                del si.getparent()[0]
+    return strings
+
+def _xlsx_date_styles(archive):
+    """Indexes of the cell styles that format numbers as dates, and of those that format them as durations."""
+    if 'xl/styles.xml' not in archive.namelist():
+        return set(), set()
+    styles = etree.fromstring(archive.read('xl/styles.xml'))
+    codes = {int(fmt.get('numFmtId')): fmt.get('formatCode') for fmt in styles.iterfind(f'{_xl}numFmts/{_xl}numFmt')}
+    dates, durations = set(), set()
+    for i, xf in enumerate(styles.iterfind(f'{_xl}cellXfs/{_xl}xf')):
+        fmt_id = int(xf.get('numFmtId', 0))
+        code = codes.get(fmt_id) or builtin_format_code(fmt_id)
+        if code and is_date_format(code):
+            dates.add(i)
+            if is_timedelta_format(code):
+                durations.add(i)
+    return dates, durations
+
+def read_xlsx_table(file_path, header=0, usecols=None):
+    """The first sheet of an .xlsx workbook as pd.read_excel(file_path, header=header, usecols=usecols) reads it.
+
+    usecols is an Excel column range such as 'B:O'. Streams the sheet XML with lxml.iterparse and
+    converts only the cells of the rows from header on in those columns, instead of building an
+    openpyxl cell object for every cell of the sheet. Values follow openpyxl (cached formula
+    results, shared/inline strings, booleans, date/duration styles, error cells as NaN) and type
+    inference is the same TextParser pass read_excel makes.
+    """
+    first_col, last_col = 1, None
+    if usecols is not None:
+        first, _, last = usecols.partition(':')
+        first_col, last_col = _column_number(first), _column_number(last or first)
+    with zipfile.ZipFile(file_path) as archive:
+        sheet_path, epoch = _xlsx_first_sheet(archive)
+        strings = _xlsx_shared_strings(archive)
+        dates, durations = _xlsx_date_styles(archive)
+        rows, last_with_data = [], -1
+        row_number = 0
+        with archive.open(sheet_path) as f:
+            for _, row in etree.iterparse(f, tag=f'{_xl}row', huge_tree=True):
+                r = row.get('r')
+                row_number = int(r) if r else row_number + 1
+                if row_number > header:
+                    # Rows missing from the sheet XML read as empty rows
+                    while len(rows) < row_number - header - 1:
+                        rows.append([])
+                    width = (last_col or 0) - first_col + 1
+                    values = [''] * width if last_col else []
+                    col = 0
+                    for c in row:
+                        ref = c.get('r')
+                        col = _column_number(ref.rstrip('0123456789')) if ref else col + 1
+                        kind = c.get('t', 'n')
+                        if kind == 'inlineStr':
+                            inline = c.find(f'{_xl}is')
+                            value = None if inline is None else _xlsx_text(inline)
+                        else:
+                            value = c.findtext(f'{_xl}v') or None
+                        if value is None:
+                            continue
+                        if kind == 'n':
+                            value = float(value) if '.' in value or 'e' in value or 'E' in value else int(value)
+                            style = int(c.get('s', 0))
+                            if style in dates:
+                                try:
+                                    value = from_excel(value, epoch, timedelta=style in durations)
+                                except (OverflowError, ValueError):
+                                    value = np.nan
+                            elif value == int(value):
+                                value = int(value)
+                        elif kind == 's':
+                            value = strings[int(value)]
+                        elif kind == 'b':
+                            value = bool(int(value))
+                        elif kind == 'd':
+                            value = from_ISO8601(value)
+                        elif kind == 'e':
+                            value = np.nan
+                        if value != '':
+                            last_with_data = len(rows)
+                        if col < first_col or (last_col and col > last_col):
+                            continue
+                        i = col - first_col
+                        if i >= len(values):
+                            values.extend([''] * (i + 1 - len(values)))
+                        values[i] = value
+                    rows.append(values)
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+    rows = rows[:last_with_data + 1]
+    if not rows:
+        raise ValueError("Worksheet has no rows")
+    width = max(len(row) for row in rows)
+    rows = [row if len(row) == width else row + [''] * (width - len(row)) for row in rows]
+    # Blank headers are numbered by their position in the sheet, not in the selected columns
+    rows[0] = [name if name != '' else f'Unnamed: {first_col - 1 + i}' for i, name in enumerate(rows[0])]
+    with TextParser(rows, header=0, skip_blank_lines=False) as parser:
+        return parser.read()
+
+def clean_dataframe_types(df):
+    """Ensure all dataframe columns have consistent, Arrow-compatible types.
+
+    Returns a new frame; columns that are already clean are shared with df rather than copied, so
+    cleaning frames that were cleaned before (the concatenated stores) costs next to nothing.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            # Convert all object columns to string, handling NaN values
+            df[col] = df[col].astype(str).replace('nan', '').replace('None', '')
+        elif pd.api.types.is_numeric_dtype(df[col]) and df[col].hasnans:
+            # Ensure numeric columns are properly typed
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+inventory_expected_columns = [
+    'LOC_DESC', 'DLRORD', 'MDLYR', 'MDL', 'TRM_LVL', 'DRV_TRN', 'EXT', 'INT',
+    'MCODE', 'VIN', 'DEALER_NAME', 'DLR_DLV_DT', 'DLRETA', 'ORD_CUST_NAME',
+    'ORD_CUST_EMAIL_ADDR', 'ORD_CUST_DATE', 'GOPTS', 'RTL_SALE_DT'
+]
+inventory_column_names = {
+    'LOC_DESC': 'LOC', 'DLRORD': 'ORDER', 'TRM_LVL': 'TRIM', 'DRV_TRN': 'DRIVE',
+    'DLRETA': 'ETA', 'ORD_CUST_NAME': 'CUST_NAME', 'ORD_CUST_EMAIL_ADDR': 'CUST_EMAIL',
+    'ORD_CUST_DATE': 'ORD_DATE', 'DLR_DLV_DT': 'DLV_DATE', 'RTL_SALE_DT': 'SOLD'
+}
+
+inventory_date_columns = ['ETA', 'DLV_DATE', 'ORD_DATE', 'SOLD']
+# Low-cardinality All Stores columns, held as categoricals once the stores are combined
+inventory_category_columns = ['MDL', 'TRIM', 'EXT', 'DEALER_NAME', 'LOC', 'PACKAGE', 'MDL_CANON', 'DEALER_SHORT']
+# Normalized copies used by the summaries; not shown in the All Stores grid
+inventory_canonical_columns = ['MDL_CANON', 'DEALER_SHORT']
+
+def parse_inventory_file(file):
+    """Parse one dealer inventory export into the cleaned All Stores layout."""
+    df = read_html_table(file, usecols=inventory_expected_columns)
+    df = df[[col for col in inventory_expected_columns if col in df.columns]]
+    df.rename(columns=inventory_column_names, inplace=True)
+    if 'MDLYR' in df.columns:
+        df['MDLYR'] = df['MDLYR'].apply(lambda x: str(x).strip()[:-1])
+    if 'MCODE' in df.columns:
+        df['MCODE'] = df['MCODE'].astype(str).str.replace(',', '')
+    if 'MDL' in df.columns:
+        df['EXT'] = map_unique(df['EXT'], ext_mapping)
+    # Dates stay datetime64; they are only formatted for display
+    df[inventory_date_columns] = df[inventory_date_columns].apply(lambda col: pd.to_datetime(col, errors='coerce'))
+    df['PACKAGE'] = classify_packages(df['GOPTS'])
+    df.drop(columns=['GOPTS'], inplace=True)
+    cols = df.columns.tolist()
+    drive_index = cols.index('DRIVE')
+    cols.insert(drive_index + 1, cols.pop(cols.index('PACKAGE')))
+    df = df[cols]
+    # Clean dataframe types to ensure Arrow compatibility
+    df = clean_dataframe_types(df)
+    df = add_canonical_columns(df)
+    # One row per unit, deduped here once so nothing downstream has to sort and dedup again
+    df['UNIT_KEY'] = unit_keys(df)
+    return latest_per_unit(df).reset_index(drop=True)
+
+def add_canonical_columns(df):
+    """Add the normalized columns the summaries group by, computed once per distinct value."""
+    df['MDL_CANON'] = map_unique(df['MDL'], norm_canonical_model)
+    df['DEALER_SHORT'] = map_unique(df['DEALER_NAME'], dealer_acronyms)
+    return df
+
+def unit_keys(df):
+    """Per-unit key: the VIN, or the order number for units that don't have one yet."""
+    vin = df['VIN'].astype(str).str.strip()
+    order = df['ORDER'].astype(str).str.strip()
+    return pd.Series(np.where(vin != '', vin, order), index=df.index)
+
+def _sorted_codes(values):
+    """Integer codes that sort like values (missing values last), ranking only the distinct values."""
+    codes, uniques = pd.factorize(values)
+    ranks = np.empty(len(uniques) + 1, dtype=np.int64)
+    ranks[uniques.argsort()] = np.arange(len(uniques))
+    ranks[-1] = len(uniques)  # code -1: missing
+    return ranks[codes], len(uniques) + 1
+
+def latest_per_unit(df, keys=('DEALER_NAME', 'UNIT_KEY')):
+    """One row per unit, in key order: the latest ETA wins (a missing ETA counts as latest), ties go to the later row.
+
+    Same result as sorting by keys + ETA and keeping the last row of each unit, without the
+    multi-column string sort: each key is hashed and only its distinct values are ranked, so the
+    rows themselves are ordered by a single integer sort.
+    """
+    if df.empty:
+        return df
+    unit = np.zeros(len(df), dtype=np.int64)
+    for key in keys:
+        codes, size = _sorted_codes(df[key])
+        unit = unit * size + codes
+    # ETA ranks as a third key (NaT last, as in the sort); stable, so tied rows keep their order
+    eta, size = _sorted_codes(df['ETA'])
+    order = np.argsort(unit * size + eta, kind='stable')
+    sorted_unit = unit[order]
+    last = np.append(sorted_unit[1:] != sorted_unit[:-1], True)
+    return df.iloc[order[last]]
+
+def compact_inventory(df):
+    """Convert the low-cardinality inventory columns to categoricals."""
+    return df.astype({col: 'category' for col in inventory_category_columns if col in df.columns})
+
+sales_90_columns = [
+    "Model",
+    "Units Sold Rolling Days 90",
+    "Units Sold-MTD",
+    "Dlr Invoice",
+    "Dlr Inventory",  # Current Inventory
+    "Dlr Days Supply",
+    "Wholesale to Retail Dealer (avg days)",
+    "Wholesale to Retail District (avg days)",
+    "Wholesale to Retail Region (avg days)",
+]
+
+def parse_90_day_file(file_path):
+    """Parse one 90-day sales export into one row per model line."""
+    data = read_html_table(file_path)
+    cleaned_data = data.iloc[2:, :9]  # Ignore headers and excess columns
+    cleaned_data.columns = sales_90_columns
+    numeric_columns = sales_90_columns[1:]
+    cleaned_data[numeric_columns] = cleaned_data[numeric_columns].apply(pd.to_numeric, errors="coerce")
+    cleaned_data = cleaned_data.dropna(subset=["Model"])
+    cleaned_data["MDL_CANON"] = map_unique(cleaned_data["Model"], norm_canonical_model)
+    return cleaned_data
+
+def read_cdk_sheet(file_path, header=4, usecols='B:O'):
+    """The CDK vehicle list as pd.read_excel(file_path, header=4, usecols='B:O') reads it, through the fastest reader available.
+
+    The calamine engine when python-calamine is installed (and pandas is 2.2 or newer, which otherwise
+    rejects the engine name), otherwise the streaming read_xlsx_table; a workbook either can't read
+    falls back to read_excel's default openpyxl engine.
+    """
+    try:
+        return pd.read_excel(file_path, header=header, usecols=usecols, engine='calamine')
+    except ImportError:
+        pass
+    except ValueError as e:
+        if not str(e).startswith('Unknown engine'):
+            return pd.read_excel(file_path, header=header, usecols=usecols)
+    except Exception:
+        return pd.read_excel(file_path, header=header, usecols=usecols)
+    try:
+        return read_xlsx_table(file_path, header=header, usecols=usecols)
+    except Exception:
+        return pd.read_excel(file_path, header=header, usecols=usecols)
+
+def ext_color_name(color):
+    """Full color name for a CDK color ('XEX/GRAY/BLACK' → 'GRAY/BLACK'), keyed on its first three characters."""
+    return ext_mapping.get(color[:3], color) if isinstance(color, str) else color
+
+def parse_current_inventory(file_path):
+    """Parse the CDK InventoryUpdate.xlsx workbook."""
+    df = read_cdk_sheet(file_path)
+    del df['Deal \nNo.']
+    del df['Make']
+    df.columns = [
+        'STOCK', 'YEAR', 'MDL', 'MCODE', 'COLOR', 'LOT', 'COMPANY',
+        'AGE', 'STATUS', 'VIN', 'BALANCE', 'CUSTOM'
+    ]
+    df['YEAR'] = pd.to_numeric(df['YEAR'], errors='coerce').fillna(0).astype(int)
+    df['BALANCE'] = pd.to_numeric(df['BALANCE'], errors='coerce').fillna(0.0)
+    df['COLOR'] = map_unique(df['COLOR'], ext_color_name)
+    df['MCODE'] = df['MCODE'].astype(str).str.replace(',', '', regex=False)
+    df['MDL']   = map_unique(df['MDL'], mdl_mapping)
+    df.sort_values(by='COMPANY', inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    # Clean types to ensure Arrow compatibility
+    return clean_dataframe_types(df)
+
+# Snapshot namespace → parser for every kind of source file
+parsers = {
+    'inventory': parse_inventory_file,
+    'sales90': parse_90_day_file,
+    'cdk': parse_current_inventory,
+}
+
+def _parse_source(kind, file_path):
+    """Worker: parse one source and write its snapshot. Returns (rows, seconds, parse error, snapshot error)."""
+    start = time.perf_counter()
+    try:
+        df = parsers[kind](file_path)
+    except Exception as e:
+        return 0, time.perf_counter() - start, str(e), None
+    if df is None:
+        return 0, time.perf_counter() - start, None, 'the parser returned no data'
+    try:
+        snapshot_cache.save_snapshot(file_path, df, namespace=kind)
+    except Exception as e:
+        return len(df), time.perf_counter() - start, None, str(e)
+    return len(df), time.perf_counter() - start, None, None
+
+_prefetch_lock = threading.Lock()
+_spawn = multiprocessing.get_context('spawn')
+
+def prefetch_sources(sources, max_workers=None):
+    """Parse every (kind, path) source without a current snapshot, in parallel worker processes.
+
+    read_html/openpyxl hold the GIL, so stores are parsed in separate processes rather than
+    threads. Afterwards every source loads from its snapshot. A source that fails to parse, or
+    whose snapshot can't be written, is recorded against its fingerprint and skipped from then on
+    until the file changes; its loader re-raises the parse error or parses it once in-process.
+    Without a Parquet engine nothing is parsed here, as the workers' output couldn't be kept: each
+    source is reported 'unsaved' once per version and left to its loader. Returns one timing row
+    per source.
+
+    Sessions call this from their own threads on every rerun; one prefetch runs at a time, so a
+    changed file is parsed once and later callers find its snapshot. Workers are spawned rather
+    than forked, which isn't safe in the threaded server.
+    """
+    with _prefetch_lock:
+        return _prefetch_sources(sources, max_workers)
+
+def _prefetch_sources(sources, max_workers):
+    timings, pending = [], []
+    for kind, file_path in sources:
+        start = time.perf_counter()
+        if not os.path.exists(file_path):
+            continue
+        if snapshot_cache.parquet_available() and snapshot_cache.snapshot_path(file_path, kind) is not None:
+            timings.append({'file': str(file_path), 'kind': kind, 'status': 'snapshot', 'rows': None,
+                            'seconds': time.perf_counter() - start, 'error': None})
+        elif (failure := snapshot_cache.recorded_failure(file_path, kind)) is not None:
+            timings.append({'file': str(file_path), 'kind': kind, 'status': 'skipped', 'rows': None,
+                            'seconds': time.perf_counter() - start, 'error': failure[0]})
+        elif not snapshot_cache.parquet_available():
+            snapshot_cache.record_failure(file_path, kind, 'no Parquet engine installed', parse_failed=False)
+            timings.append({'file': str(file_path), 'kind': kind, 'status': 'unsaved', 'rows': None,
+                            'seconds': time.perf_counter() - start,
+                            'error': 'snapshot not saved: no Parquet engine installed'})
+        else:
+            pending.append((kind, file_path))
+    # Largest files first so one big export doesn't end up parsed last
+    pending.sort(key=lambda job: os.path.getsize(job[1]), reverse=True)
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_spawn) as pool:
+                results = list(pool.map(_parse_source, *zip(*pending)))
+        except Exception:
+            results = None  # no usable process pool here; parse in-process instead
+    if results is None:
+        results = [_parse_source(kind, file_path) for kind, file_path in pending]
+    for (kind, file_path), (rows, seconds, error, snapshot_error) in zip(pending, results):
+        if error or snapshot_error:
+            snapshot_cache.record_failure(file_path, kind, error or snapshot_error, parse_failed=bool(error))
+        timings.append({'file': str(file_path), 'kind': kind, 'status': 'error' if error else 'parsed',
+                        'rows': rows, 'seconds': seconds,
+                        'error': error or (f"snapshot not saved: {snapshot_error}" if snapshot_error else None)})
+    return timings
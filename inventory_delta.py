@@ -0,0 +1,99 @@
+"""Unit-level differences between two inventory snapshots, keyed per dealer on UNIT_KEY (VIN, or order number)."""
+import numpy as np
+import pandas as pd
+import ingest
+
+# A unit is a UNIT_KEY at one dealer, as in combined_data (ingest.latest_per_unit)
+unit_columns = ('DEALER_NAME', 'UNIT_KEY')
+# Not compared: the keys themselves and the normalized copies of MDL / DEALER_NAME
+delta_ignored_columns = list(unit_columns) + ingest.inventory_canonical_columns
+
+def _plain(values):
+    return values.astype(values.cat.categories.dtype) if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+def _differs(old, new):
+    """Boolean array: where old and new hold different values (two missing values count as equal)."""
+    if isinstance(old.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+        # Recode both onto one category set and compare the integer codes (missing is -1 on both sides)
+        categories = old.cat.categories.union(new.cat.categories)
+        return old.cat.set_categories(categories).cat.codes.to_numpy() != new.cat.set_categories(categories).cat.codes.to_numpy()
+    old, new = _plain(old), _plain(new)
+    return ((old != new) & ~(old.isna() & new.isna())).to_numpy(dtype=bool)
+
+def _display(values):
+    """Values as text for the BEFORE / AFTER columns; missing values become ''."""
+    values = _plain(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%m-%d-%Y').fillna('')
+    return values.astype(object).where(values.notna(), '').astype(str)
+
+def _unit_index(df, keys):
+    return pd.MultiIndex.from_arrays([df[key].to_numpy(dtype=object) for key in keys])
+
+def diff_inventory(before, after, keys=unit_columns, columns=None):
+    """Compare two snapshots of the All Stores frame.
+
+    Repeated units are first reduced to the row combined_data keeps (ingest.latest_per_unit), then
+    matched with a hash join on keys, never row by row; a unit that changed dealer is removed at
+    one and added at the other. Returns a dict with 'added' (rows only in after), 'removed' (rows
+    only in before) and 'changed': one row per changed value with the unit's key, VIN, dealer and
+    model (as of after), the COLUMN name and its BEFORE / AFTER text.
+    """
+    keys = list(keys)
+    before = ingest.latest_per_unit(before, keys).reset_index(drop=True)
+    after = ingest.latest_per_unit(after, keys).reset_index(drop=True)
+    if columns is None:
+        columns = [col for col in after.columns
+                   if col in before.columns and col not in delta_ignored_columns and col not in keys]
+    # Hash join: position of each after-unit in before (-1 when it is new)
+    positions = _unit_index(before, keys).get_indexer(_unit_index(after, keys))
+    matched = positions >= 0
+    kept = np.zeros(len(before), dtype=bool)
+    kept[positions[matched]] = True
+    added = after[~matched]
+    removed = before[~kept]
+
+    old_rows = before.iloc[positions[matched]].reset_index(drop=True)
+    new_rows = after[matched].reset_index(drop=True)
+    differs = {}
+    for col in columns:
+        mask = _differs(old_rows[col], new_rows[col])
+        if mask.any():
+            differs[col] = mask
+    # Only the units with at least one change are formatted for display
+    rows = np.flatnonzero(np.logical_or.reduce(list(differs.values()))) if differs else np.empty(0, dtype=np.intp)
+    old_rows, new_rows = old_rows.iloc[rows], new_rows.iloc[rows]
+    context = {'UNIT_KEY': new_rows['UNIT_KEY'].to_numpy()}
+    for col in ['VIN', 'DEALER_NAME', 'MDL']:
+        if col in new_rows.columns:
+            context[col] = _display(new_rows[col]).to_numpy()
+    changes = []
+    for col, mask in differs.items():
+        mask = mask[rows]
+        changes.append(pd.DataFrame({
+            **{name: values[mask] for name, values in context.items()},
+            'COLUMN': col,
+            'BEFORE': _display(old_rows[col][mask]).to_numpy(),
+            'AFTER': _display(new_rows[col][mask]).to_numpy(),
+        }))
+    changed = (pd.concat(changes, ignore_index=True) if changes
+               else pd.DataFrame(columns=list(context) + ['COLUMN', 'BEFORE', 'AFTER']))
+    return {'added': added.reset_index(drop=True), 'removed': removed.reset_index(drop=True), 'changed': changed}
+
+def _units(df):
+    return df[[col for col in unit_columns if col in df.columns]].drop_duplicates()
+
+def summarize_delta(delta):
+    """Headline counts for a diff_inventory result; 'moved' counts the units removed at one dealer and added at another."""
+    changed = delta['changed']
+    eta_changed = changed[changed['COLUMN'] == 'ETA']
+    moved = pd.Index(delta['added']['UNIT_KEY'].to_numpy(dtype=object)).intersection(
+        pd.Index(delta['removed']['UNIT_KEY'].to_numpy(dtype=object)))
+    return {
+        'added': len(delta['added']),
+        'removed': len(delta['removed']),
+        'changed': len(_units(changed)),
+        'moved': len(moved),
+        'eta_changed': len(_units(eta_changed)),
+        'sold': int(np.count_nonzero((changed['COLUMN'] == 'SOLD') & (changed['BEFORE'] == ''))),
+    }
@@ -0,0 +1,131 @@
+"""Upload history: every inventory export that gets parsed is kept as a timestamped snapshot in SQLite.
+
+The Parquet snapshots in snapshot_cache only hold the current version of each file; this keeps the
+older ones too (one row per unit per upload) so earlier exports can be queried and compared.
+"""
+import json, os, sqlite3
+from contextlib import closing
+from pathlib import Path
+import pandas as pd
+import ingest, snapshot_cache
+
+history_path = Path("history.sqlite")
+
+# Columns kept per unit; dates are stored as ISO text, everything else as text/real
+history_columns = [
+    'UNIT_KEY', 'LOC', 'ORDER', 'MDLYR', 'MDL', 'TRIM', 'DRIVE', 'PACKAGE', 'EXT', 'INT', 'MCODE',
+    'VIN', 'DEALER_NAME', 'DLV_DATE', 'ETA', 'CUST_NAME', 'CUST_EMAIL', 'ORD_DATE', 'SOLD',
+    'MDL_CANON', 'DEALER_SHORT',
+]
+history_date_columns = ['DLV_DATE', 'ETA', 'ORD_DATE', 'SOLD']
+
+_schema = """
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    uploaded_at REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    dtypes TEXT NOT NULL,
+    UNIQUE (source, sha256)
+);
+CREATE TABLE IF NOT EXISTS inventory_units (
+    upload_id INTEGER NOT NULL REFERENCES uploads(upload_id),
+    {columns}
+);
+CREATE INDEX IF NOT EXISTS inventory_units_upload ON inventory_units(upload_id);
+CREATE INDEX IF NOT EXISTS inventory_units_vin ON inventory_units(VIN);
+CREATE INDEX IF NOT EXISTS inventory_units_unit ON inventory_units(UNIT_KEY);
+CREATE INDEX IF NOT EXISTS inventory_units_dealer ON inventory_units(DEALER_NAME);
+CREATE INDEX IF NOT EXISTS inventory_units_model ON inventory_units(MDL);
+CREATE INDEX IF NOT EXISTS inventory_units_eta ON inventory_units(ETA);
+""".format(columns=",\n    ".join(f'"{col}"' for col in history_columns))
+
+def connect(path=None):
+    """Open the history database, creating the tables on first use."""
+    con = sqlite3.connect(path or history_path)
+    con.executescript(_schema)
+    return con
+
+def _to_sql_values(df):
+    out = pd.DataFrame(index=df.index)
+    for col in history_columns:
+        if col not in df.columns:
+            out[col] = None
+        elif col in history_date_columns:
+            out[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+        else:
+            out[col] = df[col].astype(object)
+    return out.astype(object).where(out.notna(), None)
+
+def record_upload(file_path, df, path=None):
+    """Store df (the parsed export at file_path) as a new upload; returns its upload_id.
+
+    An export whose content is already in the history (same file, same sha256) is not stored
+    again; the existing upload_id is returned instead.
+    """
+    digest = snapshot_cache.file_digest(file_path)
+    source = str(file_path)
+    df = df.assign(UNIT_KEY=ingest.unit_keys(df))
+    with closing(connect(path)) as con, con:
+        row = con.execute("SELECT upload_id FROM uploads WHERE source = ? AND sha256 = ?", (source, digest)).fetchone()
+        if row:
+            return row[0]
+        dtypes = {col: str(df[col].dtype) for col in history_columns if col in df.columns}
+        cur = con.execute(
+            "INSERT INTO uploads (source, sha256, uploaded_at, rows, dtypes) VALUES (?, ?, ?, ?, ?)",
+            (source, digest, os.stat(file_path).st_mtime, len(df), json.dumps(dtypes)),
+        )
+        upload_id = cur.lastrowid
+        values = _to_sql_values(df)
+        placeholders = ", ".join("?" * (len(history_columns) + 1))
+        quoted = ", ".join(f'"{col}"' for col in history_columns)
+        con.executemany(
+            f"INSERT INTO inventory_units (upload_id, {quoted}) VALUES ({placeholders})",
+            ((upload_id, *rec) for rec in values.itertuples(index=False, name=None)),
+        )
+        return upload_id
+
+def list_uploads(source=None, path=None):
+    """Uploads newest first, with per-upload unit counts: one SQL aggregation, no frames loaded."""
+    query = """
+        SELECT u.upload_id, u.source, datetime(u.uploaded_at, 'unixepoch', 'localtime') AS uploaded_at,
+               u.rows, COUNT(DISTINCT i.UNIT_KEY) AS units, COUNT(DISTINCT i.MDL) AS models,
+               SUM(i.LOC = 'RETAILED') AS retailed
+        FROM uploads u LEFT JOIN inventory_units i ON i.upload_id = u.upload_id
+        {where}
+        GROUP BY u.upload_id
+        ORDER BY u.uploaded_at DESC, u.upload_id DESC
+    """
+    where, params = ("WHERE u.source = ?", (str(source),)) if source else ("", ())
+    with closing(connect(path)) as con:
+        return pd.read_sql_query(query.format(where=where), con, params=params)
+
+def load_upload(upload_id, path=None):
+    """The stored frame for one upload, with the dtypes it had when it was recorded."""
+    quoted = ", ".join(f'"{col}"' for col in history_columns)
+    with closing(connect(path)) as con:
+        dtypes = json.loads(con.execute("SELECT dtypes FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()[0])
+        df = pd.read_sql_query(f"SELECT {quoted} FROM inventory_units WHERE upload_id = ? ORDER BY rowid",
+                               con, params=(upload_id,))
+    df = df[[col for col in history_columns if col in dtypes]]
+    for col in history_date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df.astype({col: dtype for col, dtype in dtypes.items() if not dtype.startswith('datetime')})
+
+def upload_id_for(file_path, path=None):
+    """The upload holding file_path's current content, or None if it was never recorded."""
+    with closing(connect(path)) as con:
+        row = con.execute("SELECT upload_id FROM uploads WHERE source = ? AND sha256 = ?",
+                          (str(file_path), snapshot_cache.file_digest(file_path))).fetchone()
+    return row[0] if row else None
+
+def previous_upload(source, upload_id, path=None):
+    """The upload of source recorded just before upload_id, or None."""
+    with closing(connect(path)) as con:
+        row = con.execute(
+            "SELECT upload_id FROM uploads WHERE source = ? AND upload_id < ? ORDER BY upload_id DESC LIMIT 1",
+            (str(source), upload_id),
+        ).fetchone()
+    return row[0] if row else None
@@ -1,22 +1,42 @@
 import pandas as pd, streamlit as st, os, time, plotly.graph_objects as go, plotly.express as px, warnings, numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from io import BytesIO
 import shutil
 from pathlib import Path
+import snapshot_cache
+import ingest
+import inventory_history
+import inventory_delta
+import summaries
+import profiling
+import paging
+import trade_sheets
+from summaries import dlr_acronyms, horizon_granularities
+from trade_sheets import trade_locations
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
 st.set_page_config(layout="wide", page_title="Nissan Inventory", page_icon="logo.png", initial_sidebar_state="collapsed")
 
+# Time and memory of every stage of this run, shown in the Diagnostics expander at the bottom
+profiling.set_tracing(profiling.tracing_requested())
+profile = profiling.Profile()
+summarize_current_inventory = profile.wrap(summaries.summarize_current_inventory)
+incoming_tab_visible_models = profile.wrap(summaries.incoming_tab_visible_models)
+reindex_table_to_match_models = profile.wrap(summaries.reindex_table_to_match_models)
+dataframe_to_html = profile.wrap(summaries.dataframe_to_html)
+dataframe_to_html_90 = profile.wrap(summaries.dataframe_to_html_90)
+
 # Ensure files directory exists
 files_dir = Path("files")
 files_dir.mkdir(exist_ok=True)
 
 # File upload and management functions
 def save_uploaded_files(uploaded_files):
-    """Save uploaded files to the appropriate directory and clear cache."""
+    """Save uploaded files to the appropriate directory.
+
+    Cached loaders are keyed on each source file's fingerprint, so only the data derived from
+    the files written here is re-parsed on the next run; nothing else is invalidated.
+    """
     if uploaded_files:
         saved_files = []
         for uploaded_file in uploaded_files:
@@ -29,8 +49,6 @@ def save_uploaded_files(uploaded_files):
             with open(file_path, "wb") as f:
                 f.write(uploaded_file.getbuffer())
             saved_files.append(uploaded_file.name)
-        # Clear all caches to reload data
-        st.cache_data.clear()
         return saved_files
     return []
 
@@ -46,289 +64,144 @@ store_files = {
     "Lake Norman": "files/Lake90.xls",
     "Winston-Salem": "files/Winston90.xls",
 }
-ext_mapping = {
-    'A20': 'RED ALERT', 'B51': 'ELECTRIC BLUE', 'BW5': 'HERMOSA BLUE', 'CAS': 'MOCHA ALMOND',
-    'CBF': 'CANYON BRONZE', 'XLC': 'GUN/RED', 'XLE': 'YELLOW/BLACK', 'XLD': 'ICE/BLACK',
-    'DAN': 'OBSIDIAN GREEN', 'DAQ': 'TACTICAL GREEN', 'EBB': 'MONARCH ORANGE', 'EBL': 'SUNSET DRIFT',
-    'G41': 'MAGNETIC BLACK', 'GAQ': 'GRAY/BLACK ROOF', 'HAL': 'BAJA STORM', 'K23': 'BRILLIANT SILVER',
-    'KAD': 'GUN METALLIC', 'KAY': 'CHAMPAGNE SILVER', 'KBY': 'BOULDER GRAY', 'KCH': 'ETHOS GRAY',
-    'KH3': 'SUPER BLACK', 'NAW': 'COULIS RED', 'NBL': 'SCARLET EMBER', 'NBQ': 'ROSEWOOD',
-    'NBY': 'CARDINAL RED', 'QAB': 'PEARL WHITE', 'QAC': 'ASPEN WHITE', 'QAK': 'GLACIER WHITE',
-    'QM1': 'FRESH POWDER', 'RAY': 'DEEP BLUE PEARL', 'RBD': 'STORM BLUE', 'RBY': 'CASPIAN BLUE',
-    'RCJ': 'DEEP OCEAN BLUE', 'XAB': 'WHITE/BLACK', 'XAH': 'ORANGE/BLACK', 'XBJ': 'WHITE/BLACK',
-    'XDU': 'RED/BLACK', 'XEU': 'BLUE/BLACK', 'XEW': 'CHAMP/BLACK', 'XEX': 'GRAY/BLACK',
-    'XFN': 'GREEN/BLACK', 'XGY': 'BLUE/BLACK', 'XKV': 'TAN/BLACK', 'XEV': 'ORANGE/BLACK',
-    'DAP': 'NORTHERN LIGHTS', 'GAT': 'BLACK DIAMOND', 'XGA': 'WHITE/BLACK', 'XGB': 'SILVER/BLACK',
-    'XGD': 'RED/BLACK', 'XGH': 'GRAY/BLACK', 'XGJ': 'COPPER/BLACK', 'XGU': 'BLUE/BLACK',
-    'NCA': 'BURGUNDY', 'QBE': 'EVEREST WHITE', 'KBZ': 'ATLANTIC GRAY', 'XKY': 'ATLANTIC/BLACK',
-    'XKJ': 'EVEREST/BLACK', 'RCF': 'BLUESTONE PEARL', 'XHQ': 'DEEP OCEAN/BLACK', 'XJR': 'SEIRAN BLUE/BLACK',
-    'XHN': 'BLU/GRAY', 'XHN': 'BLUE/GRAY', 'ECG': 'ORANGE', 'ECD': 'ORANGE', 'DAR': 'ALPINE',
-    'XKN': 'AURORA/BLACK', 'FAN': 'AURORA', 'KCF': 'CHAMPAGNE', 'XLW': 'ALPINE/BLACK',
-    'XBF': 'SILVER/BLACK', 'YCU': 'RED/BLACK',
-}
-mdl_mapping = {
-    'ALTIMA': 'ALT', 'ARMADA': 'ARM', 'FRONTIER': '720', 'KICKS': 'KIX', 'LEAF ELECTRIC': 'LEF',
-    'MURANO': 'MUR', 'PATHFINDER': 'PTH', 'ROGUE': 'RGE', 'SENTRA': 'SEN', 'TITAN': 'TTN',
-    'VERSA': 'VSD', 'Z NISMO': 'Z', 'Z PROTO': 'Z'
-}
-dealer_acronyms = {
-    'MODERN NISSAN OF CONCORD': 'CONCORD', 'MODERN NISSAN OF HICKORY': 'HICKORY',
-    'MODERN NISSAN, LLC': 'WINSTON', 'MODERN NISSAN/LAKE NORMAN': 'LAKE'
-}
-
-dlr_acronyms = {
-    'Concord': 'CONCORD', 'Hickory': 'HICKORY', 'Lake Norman': 'LAKE',
-    'Winston-Salem': 'WINSTON'
-}
 
-reverse_mdl_mapping = {'ALT': 'ALTIMA', 'ARM': 'ARMADA', '720': 'FRONTIER', 'KIX': 'KICKS', 'LEF': 'LEAF',
-    'MUR': 'MURANO', 'PTH': 'PATHFINDER', 'RGE': 'ROGUE', 'SEN': 'SENTRA', 'TTN': 'TITAN', 'VSD': 'VERSA',
-    'ARI': 'ARIYA', 'TXD': 'TITAN XD'}
-
-# Aliases so variants collapse to one row with the canonical name
-model_canonical_aliases = {
-    'PTHFINDR': 'PATHFINDER',
-    'NKX': 'KICKS',
-    'N KICKS': 'KICKS',
-    'Z COUPE': 'Z',
-    'VSD': 'VERSA',
-}
+@profile()
+@st.cache_data(max_entries=32)
+def load_inventory_file(file, fingerprint):
+    """Parsed inventory export for one store; fingerprint only keys the cache."""
+    # Reuse the on-disk snapshot unless this export changed since it was last parsed
+    return snapshot_cache.load_or_parse(file, ingest.parse_inventory_file, 'inventory')
 
-def norm_canonical_model(m):
-    """Normalize model name: apply code→full name, then alias→canonical (e.g. PTHFINDR→PATHFINDER, NKX→KICKS)."""
-    s = str(m).strip().upper()
-    s = reverse_mdl_mapping.get(s, s)
-    s = model_canonical_aliases.get(s, s)
-    return s
-
-excluded_dealers = ["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"]
-
-def clean_dataframe_types(df):
-    """Ensure all dataframe columns have consistent, Arrow-compatible types."""
-    df = df.copy()
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            # Convert all object columns to string, handling NaN values
-            df[col] = df[col].astype(str).replace('nan', '').replace('None', '')
-        elif pd.api.types.is_numeric_dtype(df[col]):
-            # Ensure numeric columns are properly typed
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    return df
-
-@st.cache_data
+@profile()
 def load_data(file_paths):
-    expected_columns = [
-        'LOC_DESC', 'DLRORD', 'MDLYR', 'MDL', 'TRM_LVL', 'DRV_TRN', 'EXT', 'INT',
-        'MCODE', 'VIN', 'DEALER_NAME', 'DLR_DLV_DT', 'DLRETA', 'ORD_CUST_NAME',
-        'ORD_CUST_EMAIL_ADDR', 'ORD_CUST_DATE', 'GOPTS', 'RTL_SALE_DT'
-    ]
-    new_column_names = {
-        'LOC_DESC': 'LOC', 'DLRORD': 'ORDER', 'TRM_LVL': 'TRIM', 'DRV_TRN': 'DRIVE',
-        'DLRETA': 'ETA', 'ORD_CUST_NAME': 'CUST_NAME', 'ORD_CUST_EMAIL_ADDR': 'CUST_EMAIL',
-        'ORD_CUST_DATE': 'ORD_DATE', 'DLR_DLV_DT': 'DLV_DATE', 'RTL_SALE_DT': 'SOLD'
-    }
     data_frames = []
     for file in file_paths:
-        if os.path.exists(file):
-            dfs = pd.read_html(file)
-            if dfs:
-                df = dfs[0]
-                df = df[[col for col in expected_columns if col in df.columns]].copy()
-                df.rename(columns=new_column_names, inplace=True)
-                if 'MDLYR' in df.columns:
-                    df['MDLYR'] = df['MDLYR'].apply(lambda x: str(x).strip()[:-1])
-                if 'MCODE' in df.columns:
-                    df['MCODE'] = df['MCODE'].astype(str).str.replace(',', '')
-                if 'MDL' in df.columns:
-                    df['EXT'] = df['EXT'].replace(ext_mapping)
-                date_columns = ['ETA', 'DLV_DATE', 'ORD_DATE', 'SOLD']
-                df[date_columns] = df[date_columns].apply(lambda col: pd.to_datetime(col, errors='coerce').dt.strftime('%m-%d-%Y'))
-                df['Premium'] = df['GOPTS'].apply(lambda x: 'PRM' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['PRM', 'PR1', 'PR2', 'PR3']) else '')
-                df['Technology'] = df['GOPTS'].apply(lambda x: 'TECH' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['TEC', 'TE1', 'TE2', 'TE3']) else '')
-                df['Convenience'] = df['GOPTS'].apply(lambda x: 'CONV' if pd.notna(x) and isinstance(x, str) and any(sub in x for sub in ['CN1', 'CN2', 'CN3', 'CN4', 'CN5']) else '')
-                df['PACKAGE'] = df[['Premium', 'Technology', 'Convenience']].apply(lambda x: ' '.join(filter(None, x)), axis=1)
-                df.drop(columns=['Premium', 'Technology', 'Convenience', 'GOPTS'], inplace=True)
-                cols = df.columns.tolist()
-                drive_index = cols.index('DRIVE')
-                cols.insert(drive_index + 1, cols.pop(cols.index('PACKAGE')))
-                df = df[cols]
-                df.sort_values(by='MDL', inplace=True)
-                df.reset_index(drop=True, inplace=True)
-                # Clean dataframe types to ensure Arrow compatibility
-                df = clean_dataframe_types(df)
+        fingerprint = snapshot_cache.file_fingerprint(file)
+        if fingerprint:
+            df = load_inventory_file(file, fingerprint)
+            if df is not None:
                 data_frames.append((df, file))
         else:
             st.error(f"File {file} not found in the repository.")
     return data_frames
 
-def add_unit_key(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    vin = df['VIN'].astype(str).str.strip()
-    order = df['ORDER'].astype(str).str.strip()
-    df['UNIT_KEY'] = np.where(vin != '', vin, order)
-    return df
+# The large frames are cached as shared objects: every rerun gets the cached frame itself instead of
+# an unpickled copy. Nothing modifies them in place; the summaries and grids derive new frames.
+@profile()
+@st.cache_resource(max_entries=4)
+def build_combined_data(file_paths, fingerprints):
+    """Deduplicated All Stores frame; rebuilt only when one of the store exports changes."""
+    data_frames = load_data(file_paths)
+    if not data_frames:
+        return pd.DataFrame()
+    # Each store frame is already one row per unit (ingest.latest_per_unit ran when it was parsed)
+    combined_data = pd.concat([df for df, _ in data_frames], ignore_index=True)
+    # Clean types after concatenation to ensure Arrow compatibility, then store the
+    # low-cardinality columns as categoricals (categories don't survive concat, so this comes last)
+    return ingest.compact_inventory(ingest.clean_dataframe_types(combined_data))
+
+# Parse every changed source file up front, in parallel; the loaders below then read snapshots
+source_files = (
+    [('inventory', fp) for fp in file_paths]
+    + [('sales90', fp) for fp in store_files.values()]
+    + [('cdk', 'InventoryUpdate.xlsx')]
+)
+load_started = time.perf_counter()
+try:
+    with profile.stage('prefetch_sources'):
+        load_timings = ingest.prefetch_sources(source_files)
+except Exception:
+    load_timings = []
+if any(t['status'] in ('parsed', 'error') for t in load_timings):
+    st.session_state['load_timings'] = (load_timings, time.perf_counter() - load_started)
+
+# Every newly parsed inventory export also goes into the upload history (best-effort, like the snapshots);
+# without a Parquet engine a new export shows up as 'unsaved' instead and its loader parses it here
+for timing in load_timings:
+    if timing['kind'] == 'inventory' and timing['status'] in ('parsed', 'unsaved'):
+        try:
+            with profile.stage('record_upload'):
+                inventory_history.record_upload(
+                    timing['file'], load_inventory_file(timing['file'], snapshot_cache.file_fingerprint(timing['file']))
+                )
+        except Exception:
+            pass
 
 # Load data with error handling
+inventory_fingerprints = tuple(snapshot_cache.file_fingerprint(fp) for fp in file_paths)
+# Cheap stand-in for combined_data in cache keys, so cached summaries never hash the frame itself
+data_version = snapshot_cache.dataset_version(inventory_fingerprints)
 try:
-    data_frames = load_data(file_paths)
-    if data_frames:
-        frames = []
-        for df, _ in data_frames:
-            tmp = add_unit_key(df)
-            tmp['ETA_DT'] = pd.to_datetime(tmp['ETA'], errors='coerce')
-            tmp.sort_values(['DEALER_NAME', 'UNIT_KEY', 'ETA_DT'], inplace=True, na_position='last')
-            tmp = tmp.drop_duplicates(subset=['DEALER_NAME', 'UNIT_KEY'], keep='last')
-            frames.append(tmp.drop(columns=['ETA_DT']))
-        combined_data = pd.concat(frames, ignore_index=True)
-        combined_data.reset_index(drop=True, inplace=True)
-        # Clean types after concatenation to ensure Arrow compatibility
-        combined_data = clean_dataframe_types(combined_data)
-    else:
-        combined_data = pd.DataFrame()
+    combined_data = build_combined_data(file_paths, inventory_fingerprints)
 except Exception as e:
     st.warning(f"⚠️ Error loading data: {str(e)}. Please check your uploaded files.")
     combined_data = pd.DataFrame()
         
-@st.cache_data
-def load_current_data(file_path):
+@profile()
+@st.cache_resource(max_entries=4)
+def load_current_data(file_path, fingerprint):
     if os.path.exists(file_path):
-        df = pd.read_excel(file_path, header=4, usecols='B:O')
-        del df['Deal \nNo.']
-        del df['Make']
-        df.columns = [
-            'STOCK', 'YEAR', 'MDL', 'MCODE', 'COLOR', 'LOT', 'COMPANY',
-            'AGE', 'STATUS', 'VIN', 'BALANCE', 'CUSTOM'
-        ]
-        df['YEAR'] = pd.to_numeric(df['YEAR'], errors='coerce').fillna(0).astype(int)
-        df['BALANCE'] = pd.to_numeric(df['BALANCE'], errors='coerce').fillna(0.0)
-        df['COLOR'] = df['COLOR'].apply(
-            lambda x: ext_mapping.get(str(x)[:3], x) if isinstance(x, str) else x
-        )
-        df['MCODE'] = df['MCODE'].astype(str).str.replace(',', '', regex=False)
-        df['MDL']   = df['MDL'].replace(mdl_mapping)
-        df.sort_values(by='COMPANY', inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        # Clean types to ensure Arrow compatibility
-        df = clean_dataframe_types(df)
-        return df
+        return snapshot_cache.load_or_parse(file_path, ingest.parse_current_inventory, 'cdk')
     else:
         st.error(f"File {file_path} not found.")
         return pd.DataFrame()
 
 # Load current data with error handling
+current_version = snapshot_cache.file_fingerprint('InventoryUpdate.xlsx')
 try:
     if os.path.exists('InventoryUpdate.xlsx'):
-        current_data = load_current_data('InventoryUpdate.xlsx')
+        current_data = load_current_data('InventoryUpdate.xlsx', current_version)
     else:
         current_data = pd.DataFrame()
 except Exception as e:
     st.warning(f"⚠️ Error loading current inventory data: {str(e)}")
     current_data = pd.DataFrame()
 
-@st.cache_data
-def process_90_day_sales(file_path):
-    """Process the 90-day sales data for a given file."""
+@profile()
+@st.cache_data(max_entries=32)
+def process_90_day_sales(file_path, fingerprint):
+    """Process the 90-day sales data for a given file; fingerprint only keys the cache."""
     try:
-        data = pd.read_html(file_path)[0]
-        cleaned_data = data.iloc[2:, :9]  # Ignore headers and excess columns
-        cleaned_data.columns = [
-            "Model",
-            "Units Sold Rolling Days 90",
-            "Units Sold-MTD",
-            "Dlr Invoice",
-            "Dlr Inventory",  # Current Inventory
-            "Dlr Days Supply",
-            "Wholesale to Retail Dealer (avg days)",
-            "Wholesale to Retail District (avg days)",
-            "Wholesale to Retail Region (avg days)",
-        ]
-        numeric_columns = [
-            "Units Sold Rolling Days 90",
-            "Units Sold-MTD",
-            "Dlr Invoice",
-            "Dlr Inventory",
-            "Dlr Days Supply",
-            "Wholesale to Retail Dealer (avg days)",
-            "Wholesale to Retail District (avg days)",
-            "Wholesale to Retail Region (avg days)",
-        ]
-        cleaned_data[numeric_columns] = cleaned_data[numeric_columns].apply(pd.to_numeric, errors="coerce")
-        cleaned_data = cleaned_data.dropna(subset=["Model"])
-        return cleaned_data
+        return snapshot_cache.load_or_parse(file_path, ingest.parse_90_day_file, 'sales90')
     except Exception as e:
         st.error(f"Error processing file {file_path}: {e}")
         return pd.DataFrame()
 
+@profile()
+@st.cache_data(max_entries=4)
+def load_90_day_sales(sales_fingerprints):
+    """The one 90-day sales dataset, {store: frame with ingest.sales_90_columns}, shared by the Incoming and Sales tabs."""
+    by_store = {}
+    for (store, file_path), fingerprint in zip(store_files.items(), sales_fingerprints):
+        df = process_90_day_sales(file_path, fingerprint) if fingerprint else None
+        by_store[store] = df if df is not None and not df.empty else pd.DataFrame(columns=ingest.sales_90_columns)
+    return by_store
+
 # Load data for all stores with error handling
-store_summaries = {}
-for store, file_path in store_files.items():
-    try:
-        if os.path.exists(file_path):
-            store_summaries[store] = process_90_day_sales(file_path)
-        else:
-            store_summaries[store] = pd.DataFrame(columns=["Model", "Units Sold Rolling Days 90"])
-    except Exception as e:
-        store_summaries[store] = pd.DataFrame(columns=["Model", "Units Sold Rolling Days 90"])
+sales_fingerprints = tuple(snapshot_cache.file_fingerprint(fp) for fp in store_files.values())
+sales_version = snapshot_cache.dataset_version(sales_fingerprints)
+try:
+    store_summaries = load_90_day_sales(sales_fingerprints)
+except Exception as e:
+    store_summaries = {store: pd.DataFrame(columns=ingest.sales_90_columns) for store in store_files}
 
-@st.cache_data
-def summarize_90_day_sales_by_store():
+@profile()
+@st.cache_data(max_entries=4)
+def summarize_90_day_sales_by_store(sales_fingerprints):
     try:
-        filtered_summaries = {
-            store: df for store, df in store_summaries.items()
-            if store.upper() != "NISSAN OF BOONE" and store.upper() != "EAST CHARLTOTE NISSAN" and not df.empty
-        }
-        # Normalize model names (e.g. PTHFINDR→PATHFINDER, NKX/N KICKS→KICKS) and aggregate so one row per model
-        def store_agg(df):
-            d = df.copy()
-            d["Model"] = d["Model"].apply(norm_canonical_model)
-            return d.groupby("Model", as_index=True)["Units Sold Rolling Days 90"].sum().to_frame()
-        all_stores_summary = pd.concat(
-            {store: store_agg(df) for store, df in filtered_summaries.items()},
-            axis=1
-        ).fillna(0)
-        all_stores_summary.columns = all_stores_summary.columns.get_level_values(0)
-        all_stores_summary.reset_index(inplace=True)
-        summary_long = all_stores_summary.melt(
-            id_vars=["Model"], 
-            var_name="Dealer", 
-            value_name="Units Sold Rolling Days 90"
-        )
-        return summary_long
+        return summaries.summarize_90_day_sales_by_store(store_summaries)
     except Exception as e:
         st.error(f"Error summarizing 90-day sales: {e}")
         return pd.DataFrame(columns=["Model", "Dealer", "Units Sold Rolling Days 90"])
-        
-@st.cache_data
-def format_90_day_sales(summary_90_day_sales):
-    formatted_summary = summary_90_day_sales.pivot_table(
-        values="Units Sold Rolling Days 90",
-        index="Model",
-        columns="Dealer",
-        aggfunc="sum",
-        fill_value=0
-    )
-    formatted_summary["Total"] = formatted_summary.sum(axis=1)
-    formatted_summary = formatted_summary.reset_index()
-    formatted_summary = formatted_summary[~formatted_summary["Model"].isin(["GT-R", "TITAN XD", "TOTAL"])]
-    formatted_summary.columns = [
-        dlr_acronyms.get(col, col) if col != "Model" else col
-        for col in formatted_summary.columns
-    ]
-    total_row = formatted_summary.drop(columns=["Model"]).sum(numeric_only=True)
-    total_row["Model"] = "Total"
-    formatted_summary = formatted_summary.sort_values(
-        by="Model",
-        key=lambda x: x.str.lower() if x.name == "Model" else x,
-        ignore_index=True
-    )
-    formatted_summary = pd.concat(
-        [formatted_summary, pd.DataFrame([total_row])],
-        ignore_index=True
-    )
-    return formatted_summary
 
-summary_90_day_sales = summarize_90_day_sales_by_store()
-formatted_90_day_sales = format_90_day_sales(summary_90_day_sales)
+@profile()
+@st.cache_data(max_entries=4)
+def format_90_day_sales(_summary_90_day_sales, sales_version):
+    """Model x store pivot of the 90-day sales; sales_version keys the cache instead of the frame."""
+    return summaries.format_90_day_sales(_summary_90_day_sales)
+
+summary_90_day_sales = summarize_90_day_sales_by_store(sales_fingerprints)
+formatted_90_day_sales = format_90_day_sales(summary_90_day_sales, sales_version)
 
 # Modern UI Styling
 modern_css = """
@@ -727,45 +600,222 @@ with st.expander("📁 Upload Files - Drag & Drop Your Files Folder Here", expan
                 """, unsafe_allow_html=True)
                 st.rerun()
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["🏪 All Stores", "💼 Current CDK", "🔄 Dealer Trade", "📥 Incoming", "📊 Sales"])
+    # Per-file timings of the last load that actually parsed something
+    if 'load_timings' in st.session_state:
+        timings, wall_time = st.session_state['load_timings']
+        timings_df = pd.DataFrame(timings)
+        parsed = timings_df[timings_df['status'].isin(['parsed', 'error'])]
+        st.caption(f"⏱️ Last data load: parsed {len(parsed)} file(s) in {wall_time:.2f}s wall time "
+                   f"({parsed['seconds'].sum():.2f}s of parsing across workers)")
+        st.dataframe(timings_df[['file', 'kind', 'status', 'rows', 'seconds', 'error']], hide_index=True, width='stretch')
 
-@st.cache_data
-def filter_data(df, model, trim, package, color):
-    if model != 'All':
-        df = df[df['MDL'] == model]
-    if trim != 'All':
-        df = df[df['TRIM'] == trim]
-    if package != 'All':
-        df = df[df['PACKAGE'].str.contains(package)]
-    if color != 'All':
-        df = df[df['EXT'] == color]
-    return df
+    # Earlier uploads kept in the history database
+    try:
+        upload_history = inventory_history.list_uploads()
+    except Exception:
+        upload_history = pd.DataFrame()
+    if not upload_history.empty:
+        st.caption(f"🗂️ Upload history: {len(upload_history)} inventory upload(s) stored")
+        st.dataframe(upload_history, hide_index=True, width='stretch', height=200)
+
+# Lazy tabs: on a rerun only the selected tab's content is computed. The All Stores and Dealer Trade
+# tabs hold keyed widgets and always render so their state survives switching tabs.
+tab_labels = ["🏪 All Stores", "💼 Current CDK", "🔄 Dealer Trade", "📥 Incoming", "📊 Sales", "🔁 Changes"]
+try:
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(tab_labels, key="active_tab", on_change="rerun")
+except TypeError:
+    # Streamlit without lazy tabs: every tab runs on every rerun
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(tab_labels)
+
+def tab_is_open(tab):
+    """True for the selected tab, or for every tab when this Streamlit version can't tell."""
+    return getattr(tab, 'open', None) is not False
+
+# Streamlit drops a widget's state on any run it isn't drawn, so widgets inside the lazy tabs lose
+# their value whenever another tab is open. They take their value/index from a plain session_state
+# entry instead, which remember() updates each time the widget is drawn.
+def remembered(key, default=None):
+    """The value the widget key last had, or default."""
+    return st.session_state.get(f'remembered_{key}', default)
+
+def remember(key, value):
+    """Keep value as the widget key's value for later runs; returns value."""
+    st.session_state[f'remembered_{key}'] = value
+    return value
+
+def remembered_index(key, options, default=0):
+    """index= for a selectbox over options: its remembered option, or default when that is gone."""
+    value = remembered(key)
+    return options.index(value) if value in options else default
+
+def _merge_positions(arrays):
+    return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.intp)
+
+@profile()
+@st.cache_resource(max_entries=4)
+def build_filter_index(file_paths, fingerprints):
+    """Inverted index over combined_data for the All Stores filters, built once per data load.
+
+    Holds the option lists per model and, for every model/trim/package/color value, the sorted row
+    positions carrying it, so the selectboxes and the filtered grid never rescan the frame.
+    """
+    df = build_combined_data(file_paths, fingerprints)
+    if df.empty:
+        return {'models': [], 'options': {}, 'rows': {}}
+    keys = {col: df[col].astype(str).to_numpy() for col in ['MDL', 'TRIM', 'PACKAGE', 'EXT']}
+    rows = {col: pd.Series(np.arange(len(df))).groupby(values).indices for col, values in keys.items()}
+    # A package option selects every unit whose label contains it ("PRM" also matches "PRM CONV")
+    labels = [label for label in rows['PACKAGE'] if label and label != 'nan']
+    rows['PACKAGE'] = {option: _merge_positions([rows['PACKAGE'][label] for label in labels if option in label])
+                       for option in labels}
+    options = {}
+    pairs = pd.DataFrame(keys).drop_duplicates()
+    for model, group in pairs.groupby('MDL'):
+        options[model] = {
+            'TRIM': sorted(group['TRIM'].unique().tolist()),
+            'PACKAGE': sorted(p for p in group['PACKAGE'].unique().tolist() if p and p != 'nan'),
+            'EXT': sorted(group['EXT'].unique().tolist()),
+        }
+    return {'models': sorted(options), 'options': options, 'rows': rows}
+
+def filter_options(filter_index, model, col):
+    """Selectbox options for col once model is chosen."""
+    if model == 'All':
+        return ['All']
+    return ['All'] + filter_index['options'].get(model, {}).get(col, [])
+
+def filter_positions(filter_index, selection):
+    """Row positions matching every non-'All' filter in selection ({column: value}), or None for all rows."""
+    positions = None
+    for col, value in selection.items():
+        if value == 'All':
+            continue
+        matches = filter_index['rows'][col].get(value, np.empty(0, dtype=np.intp))
+        positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+    return positions
+
+# Dates are held as datetime64 and only formatted in the grid
+inventory_date_format = {col: st.column_config.DateColumn(format="MM-DD-YYYY") for col in ingest.inventory_date_columns}
+# The same format for the grid search, so a date is found the way it reads in the grid
+inventory_search_dates = {col: '%m-%d-%Y' for col in ingest.inventory_date_columns}
+
+def inventory_grid_columns(df):
+    """Columns shown in the All Stores grid: everything but the normalized copies used by the summaries."""
+    return [col for col in df.columns if col not in ingest.inventory_canonical_columns]
+
+@profile()
+@st.cache_resource(max_entries=32)
+def grid_sort_order(_df, version, column, descending):
+    """paging.sort_order for one grid column, computed once per data load; version keys the cache."""
+    return paging.sort_order(_df[column], descending)
+
+@profile()
+@st.cache_resource(max_entries=4)
+def grid_search_text(_df, version, columns, date_formats=()):
+    """paging.search_text over the grid's columns, built once per data load; version keys the cache."""
+    return paging.search_text(_df, list(columns), dict(date_formats))
+
+def _set_page(key, page):
+    """Move the grid key to page: the page widget is rebuilt from its remembered value."""
+    remember(f'{key}_page', page)
+    st.session_state.pop(f'{key}_page', None)
+
+def _first_page(key):
+    _set_page(key, 1)
+
+@st.fragment
+def paged_grid(df, key, version, positions=None, column_order=None, column_config=None, search_dates=None):
+    """Grid over df (limited to positions, when given) with server-side search, sort and paging.
+
+    Only the rows on the current page are taken from df and sent to the browser; paging, sorting
+    or searching reruns only this fragment. With paging off, every row is sent as before.
+    search_dates maps date columns to the strftime format column_config displays them in.
+    """
+    columns = column_order or list(df.columns)
+    if not remember(f'{key}_paged', st.toggle(
+        'Server-side paging', value=remembered(f'{key}_paged', True), key=f'{key}_paged',
+        help="Send one page of rows at a time. Off: send every row and sort in the browser."
+    )):
+        st.dataframe(df if positions is None else df.iloc[positions], height=780, hide_index=True, width='stretch',
+                     column_config=column_config, column_order=column_order)
+        return
+    controls = st.columns([3, 2, 1, 1, 1])
+    with controls[0]:
+        query = remember(f'{key}_search', st.text_input(
+            '🔍 Search', value=remembered(f'{key}_search', ''), key=f'{key}_search',
+            placeholder="VIN, stock number, model, color...", on_change=_first_page, args=(key,)
+        ))
+    with controls[1]:
+        sort_options = ['(none)'] + columns
+        sort_by = remember(f'{key}_sort', st.selectbox(
+            'Sort by', sort_options, index=remembered_index(f'{key}_sort', sort_options), key=f'{key}_sort',
+            on_change=_first_page, args=(key,)
+        ))
+    with controls[2]:
+        order_options = ['Ascending', 'Descending']
+        descending = remember(f'{key}_order', st.selectbox(
+            'Order', order_options, index=remembered_index(f'{key}_order', order_options), key=f'{key}_order',
+            on_change=_first_page, args=(key,)
+        )) == 'Descending'
+    with controls[3]:
+        page_size = remember(f'{key}_page_size', st.selectbox(
+            'Rows per page', paging.page_sizes, index=remembered_index(f'{key}_page_size', paging.page_sizes, 1),
+            key=f'{key}_page_size', on_change=_first_page, args=(key,)
+        ))
+    if query.strip():
+        text = grid_search_text(df, version, tuple(columns), tuple(sorted((search_dates or {}).items())))
+        matches = paging.search_matches(text, query)
+    else:
+        matches = None
+    order = grid_sort_order(df, version, sort_by, descending) if sort_by != '(none)' else None
+    rows = paging.select_rows(len(df), positions, matches, order)
+    pages = paging.page_count(len(rows), page_size)
+    # Filters or data can shrink the result under the page the user was on
+    if st.session_state.get(f'{key}_page', remembered(f'{key}_page', 1)) > pages:
+        _set_page(key, pages)
+    with controls[4]:
+        page = remember(f'{key}_page', st.number_input(
+            'Page', min_value=1, max_value=pages, value=remembered(f'{key}_page', 1), step=1, key=f'{key}_page'
+        ))
+    visible = paging.page_of(rows, page, page_size)
+    if len(rows):
+        start = (page - 1) * page_size
+        st.caption(f"Rows {start + 1:,}–{start + len(visible):,} of {len(rows):,} · page {page:,} of {pages:,}")
+    else:
+        st.caption("No rows match")
+    st.dataframe(df.iloc[visible], height=780, hide_index=True, width='stretch',
+                 column_config=column_config, column_order=column_order)
+
+@st.fragment
+def all_stores_tab(combined_data, filter_index):
+    """All Stores grid; changing a filter reruns only this fragment, not the rest of the app."""
+    cols = st.columns([2, 1, 1, 1, 1])
+    with cols[0]:
+        total_vehicles = len(combined_data)
+        st.metric("Total Vehicles", f"{total_vehicles:,}")
+    with cols[1]:
+        model = st.selectbox('🚗 Model', options=['All'] + filter_index['models'], key='all_model')
+    with cols[2]:
+        trim = st.selectbox('✨ Trim', options=filter_options(filter_index, model, 'TRIM'), key='all_trim')
+    with cols[3]:
+        package = st.selectbox('📦 Package', options=filter_options(filter_index, model, 'PACKAGE'), key='all_package')
+    with cols[4]:
+        color = st.selectbox('🎨 Color', options=filter_options(filter_index, model, 'EXT'), key='all_color')
+    positions = filter_positions(filter_index, {'MDL': model, 'TRIM': trim, 'PACKAGE': package, 'EXT': color})
+    st.markdown(f"**Showing {len(combined_data) if positions is None else len(positions)} vehicle(s)**")
+    paged_grid(combined_data, 'all_grid', data_version, positions, column_order=inventory_grid_columns(combined_data),
+               column_config=inventory_date_format, search_dates=inventory_search_dates)
 
 if not combined_data.empty:
     with tab1:
-        cols = st.columns([2, 1, 1, 1, 1])
-        with cols[0]:
-            total_vehicles = len(combined_data)
-            st.metric("Total Vehicles", f"{total_vehicles:,}")
-        with cols[1]:
-            model = st.selectbox('🚗 Model', options=['All'] + sorted(combined_data['MDL'].unique().tolist()), key='all_model')
-        with cols[2]:
-            trims = ['All'] if model == 'All' else ['All'] + sorted(combined_data[combined_data['MDL'] == model]['TRIM'].unique().tolist())
-            trim = st.selectbox('✨ Trim', options=trims, key='all_trim')
-        with cols[3]:
-            packages = ['All'] if model == 'All' else ['All'] + sorted([p for p in combined_data[combined_data['MDL'] == model]['PACKAGE'].unique().tolist() if p and str(p) != 'nan'])
-            package = st.selectbox('📦 Package', options=packages, key='all_package')
-        with cols[4]:
-            colors = ['All'] if model == 'All' else ['All'] + sorted(combined_data[combined_data['MDL'] == model]['EXT'].unique().tolist())
-            color = st.selectbox('🎨 Color', options=colors, key='all_color')
-        filtered_df = filter_data(combined_data, model, trim, package, color)
-        st.markdown(f"**Showing {len(filtered_df)} vehicle(s)**")
-        st.dataframe(filtered_df, height=780, hide_index=True, width='stretch')
+        all_stores_tab(combined_data, build_filter_index(file_paths, inventory_fingerprints))
 else:
     st.error("❌ No data to display. Please upload files using the file upload section above.")
 
 with tab2:
-    if not current_data.empty:
+    if not tab_is_open(tab2):
+        pass
+    elif not current_data.empty:
         num_rows = len(current_data)
         col1, col2 = st.columns(2)
         with col1:
@@ -773,23 +823,18 @@ with tab2:
         with col2:
             avg_age = current_data['AGE'].mean() if 'AGE' in current_data.columns else 0
             st.metric("Avg Age (Days)", f"{avg_age:.1f}")
-        st.dataframe(current_data, height=780, hide_index=True, width='stretch')
+        paged_grid(current_data, 'current_grid', current_version)
     else:
         st.error("❌ No current inventory data to display. Please upload InventoryUpdate.xlsx file.")
 
 def calculate_transfer_amount(key_charge, projected_cost):
     return projected_cost - key_charge - 400
 
-def format_currency(value):
-    return "${:,.2f}".format(value)
-def get_store_number(location):
-    store_numbers = {
-        "MODERN NISSAN OF CONCORD": "STORE #3",
-        "MODERN NISSAN OF WINSTON": "STORE #2",
-        "MODERN NISSAN OF LAKE NORMAN": "STORE #6",
-        "MODERN NISSAN OF HICKORY": "STORE #11"
-    }
-    return store_numbers.get(location, "UNKNOWN STORE")
+@profile()
+@st.cache_resource(max_entries=4)
+def trade_units(_df, version, source):
+    """trade_sheets.trade_units of the All Stores or Current CDK frame, once per data load."""
+    return trade_sheets.trade_units(_df, source)
 
 with tab3:
     col1, col2 = st.columns(2)
@@ -821,16 +866,7 @@ with tab3:
     with col6:
         from_location = st.text_input("From:", key="from_input_trade")
     with col7:
-        to_location = st.selectbox(
-            "To:", 
-            [
-                "MODERN NISSAN OF CONCORD", 
-                "MODERN NISSAN OF WINSTON", 
-                "MODERN NISSAN OF LAKE NORMAN", 
-                "MODERN NISSAN OF HICKORY"
-            ], 
-            key="to_input_trade"
-        )
+        to_location = st.selectbox("To:", trade_locations, key="to_input_trade")
 
     col8, col9 = st.columns(2)
     with col8:
@@ -844,7 +880,6 @@ with tab3:
                                 format="%.2f", 
                                 key="projected_cost_input_trade"
                             )
-        formatted_projected_cost = format_currency(projected_cost)
 
     st.text("Non-Modern Dealership Information")
     dealership_name = st.text_input("Dealership Name", key="dealership_name_input_trade")
@@ -868,7 +903,6 @@ with tab3:
                                            format="%.2f",
                                            key="outgoing_projected_cost_input_trade"
                                        )
-        formatted_outgoing_proj_cost = format_currency(outgoing_projected_cost)
     with r_col:
         st.text("Incoming Unit")
         incoming_year_make_model     = st.text_input("Incoming Year Make Model", key="incoming_year_make_model_input_trade")
@@ -876,123 +910,20 @@ with tab3:
         incoming_purchase_price      = st.text_input("Incoming Purchase Price",   key="incoming_purchase_price_input_trade")
 
     if st.button("Generate Trade PDF", key="generate_trade_pdf_button"):
-        pdf_buffer = BytesIO()
-        c = canvas.Canvas(pdf_buffer, pagesize=letter)
-        width, height = letter
-        offset = 20
-
-        # Header
-        location = st.session_state["to_input_trade"]
-        title = f"{location} {get_store_number(location)}"
-        c.setFont("Helvetica-Bold", 16)
-        c.drawCentredString(width / 2.0, height - 52 - offset, title)
-        c.setFont("Helvetica", 10)
-        col1_x = 72
-        col2_x = 200
-
-        # Date & Manager
-        c.drawString(col1_x, height - 84 - offset, f"Date: {formatted_date}")
-        c.drawString(col2_x, height - 84 - offset, f"Manager: {manager}")
-
-        # Trade Checkboxes
-        c.drawString(col1_x, height - 108 - offset, "OUR TRADE")
-        c.drawString(col1_x, height - 120 - offset, f"{'         X' if our_trade else ''}")
-        c.drawString(col2_x, height - 108 - offset, "THEIR TRADE")
-        c.drawString(col2_x, height - 120 - offset, f"{'           X' if their_trade else ''}")
-        c.drawString(col1_x, height - 144 - offset, "SOLD")
-        c.drawString(col1_x, height - 156 - offset, f"{'   X' if sold else ''}")
-        c.drawString(col2_x, height - 144 - offset, "FLOORPLAN")
-        c.drawString(col2_x, height - 156 - offset, f"{'          X' if floorplan else ''}")
-
-        # Address block
-        addr_x = 320
-        c.drawString(addr_x, height - 108 - offset, "PLEASE SEND MCO/CHECK TO:")
-        c.drawString(addr_x, height - 120 - offset, "MODERN AUTOMOTIVE SUPPORT CENTER")
-        c.drawString(addr_x, height - 132 - offset, "3901 WEST POINT BLVD.")
-        c.drawString(addr_x, height - 144 - offset, "WINSTON-SALEM, NC 27103")
-
-        # Intercompany DX bar
-        c.setFillColorRGB(0.7, 0.7, 0.7)
-        c.rect(70, height - 180 - offset, 475, 20, fill=1)
-        c.setFillColorRGB(0, 0, 0)
-        c.drawString(72, height - 175 - offset, "Intercompany DX")
-
-        # From / To
-        c.drawString(72, height - 200 - offset, "From:")
-        c.drawString(140, height - 200 - offset, from_location)
-        c.drawString(330, height - 200 - offset, "To:")
-        c.drawString(380, height - 200 - offset, to_location)
-
-        # Vehicle Info
-        c.drawString(72, height - 220 - offset, "Stock Number:")
-        c.drawString(160, height - 220 - offset, stock_number)
-        c.drawString(72, height - 240 - offset, "Year/Make/Model:")
-        c.drawString(160, height - 240 - offset, year_make_model)
-        c.drawString(72, height - 260 - offset, "Full VIN #:")
-        c.drawString(160, height - 260 - offset, full_vin)
-
-        # Projected Cost (header)
-        c.drawString(330, height - 220 - offset, "Projected Cost:")
-        c.drawString(420, height - 220 - offset, formatted_projected_cost)
-
-        # Non-Modern Dealership header
-        c.setFillColorRGB(0.7, 0.7, 0.7)
-        c.rect(70, height - 290 - offset, 475, 20, fill=1)
-        c.setFillColorRGB(0, 0, 0)
-        c.drawString(72, height - 285 - offset, "Non-Modern Dealership Information")
-
-        # Non-Modern fields
-        c.drawString(72, height - 310 - offset, "Dealership Name:")
-        c.drawString(190, height - 310 - offset, dealership_name)
-        c.drawString(72, height - 330 - offset, "Address:")
-        c.drawString(190, height - 330 - offset, address)
-        c.drawString(72, height - 350 - offset, "City, State ZIP Code:")
-        c.drawString(190, height - 350 - offset, city_state_zip)
-        c.drawString(72, height - 370 - offset, "Phone Number:")
-        c.drawString(190, height - 370 - offset, phone_number)
-        c.drawString(72, height - 390 - offset, "Dealer Code:")
-        c.drawString(190, height - 390 - offset, dealer_code)
-        c.drawString(72, height - 410 - offset, "Contact Name:")
-        c.drawString(190, height - 410 - offset, contact_name)
-
-        # Outgoing Unit header
-        c.setFillColorRGB(0.7, 0.7, 0.7)
-        c.rect(70, height - 440 - offset, 475, 20, fill=1)
-        c.setFillColorRGB(0, 0, 0)
-        c.drawString(72, height - 435 - offset, "Outgoing Unit")
-
-        # Outgoing fields
-        c.drawString(72, height - 460 - offset, "Stock Number:")
-        c.drawString(190, height - 460 - offset, outgoing_stock_number)
-        c.drawString(72, height - 480 - offset, "Year Make Model:")
-        c.drawString(190, height - 480 - offset, outgoing_year_make_model)
-        c.drawString(72, height - 500 - offset, "Full VIN #:")
-        c.drawString(190, height - 500 - offset, outgoing_full_vin)
-        c.drawString(72, height - 520 - offset, "Sale Price:")
-        c.drawString(190, height - 520 - offset, outgoing_sale_price)
-        c.drawString(72, height - 540 - offset, "Projected Cost:")
-        c.drawString(190, height - 540 - offset, formatted_outgoing_proj_cost)
-
-        # Incoming Unit header
-        c.setFillColorRGB(0.7, 0.7, 0.7)
-        c.rect(70, height - 570 - offset, 475, 20, fill=1)
-        c.setFillColorRGB(0, 0, 0)
-        c.drawString(72, height - 565 - offset, "Incoming Unit")
-
-        # Incoming fields
-        c.drawString(72, height - 590 - offset, "Year Make Model:")
-        c.drawString(190, height - 590 - offset, incoming_year_make_model)
-        c.drawString(72, height - 610 - offset, "Full VIN #:")
-        c.drawString(190, height - 610 - offset, incoming_full_vin)
-        c.drawString(72, height - 630 - offset, "Purchase Price:")
-        c.drawString(190, height - 630 - offset, incoming_purchase_price)
-
-        c.showPage()
-        c.save()
-        pdf_buffer.seek(0)
-
-        pdf_data = pdf_buffer.getvalue()
-        time.sleep(0.5)
+        pdf_data = trade_sheets.trade_sheet_pdf([trade_sheets.blank_sheet(
+            date=formatted_date, manager=manager,
+            our_trade=our_trade, their_trade=their_trade, sold=sold, floorplan=floorplan,
+            from_location=from_location, to_location=to_location,
+            stock_number=stock_number, year_make_model=year_make_model, full_vin=full_vin,
+            projected_cost=projected_cost,
+            dealership_name=dealership_name, address=address, city_state_zip=city_state_zip,
+            phone_number=phone_number, dealer_code=dealer_code, contact_name=contact_name,
+            outgoing_stock_number=outgoing_stock_number, outgoing_year_make_model=outgoing_year_make_model,
+            outgoing_full_vin=outgoing_full_vin, outgoing_sale_price=outgoing_sale_price,
+            outgoing_projected_cost=outgoing_projected_cost,
+            incoming_year_make_model=incoming_year_make_model, incoming_full_vin=incoming_full_vin,
+            incoming_purchase_price=incoming_purchase_price,
+        )])
         st.download_button(
             label="Download Trade PDF",
             data=pdf_data,
@@ -1001,6 +932,76 @@ with tab3:
             key="download_trade_pdf_button"
         )
 
+    st.markdown('<div class="small-spacing"><hr></div>', unsafe_allow_html=True)
+    with st.expander("📦 Batch Trade Sheets", expanded=False):
+        st.caption("One sheet per unit. The date, manager and trade checkboxes above go on every sheet.")
+        batch_source = st.radio("Units from", ["Current CDK", "All Stores", "CSV upload"], horizontal=True, key="batch_trade_source")
+        batch_units = pd.DataFrame(columns=trade_sheets.trade_unit_columns)
+        batch_errors = []
+        if batch_source == "CSV upload":
+            csv_file = st.file_uploader("CSV with a VIN column and, optionally, a To column", type="csv", key="batch_trade_csv")
+            if csv_file is not None:
+                try:
+                    # CDK rows first: they carry the stock number and balance
+                    batch_units, batch_errors = trade_sheets.units_from_csv(csv_file, pd.concat([
+                        trade_units(current_data, current_version, 'cdk'),
+                        trade_units(combined_data, data_version, 'inventory'),
+                    ], ignore_index=True))
+                except (ValueError, pd.errors.ParserError) as e:
+                    st.error(f"Could not read the CSV: {e}")
+        else:
+            if batch_source == "Current CDK":
+                units = trade_units(current_data, current_version, 'cdk')
+            else:
+                units = trade_units(combined_data, data_version, 'inventory')
+            bcol1, bcol2 = st.columns([2, 1])
+            with bcol1:
+                wanted = st.text_area("VINs or stock numbers, one per line", key="batch_trade_units_input")
+            with bcol2:
+                batch_to = st.selectbox("To:", trade_locations, key="batch_trade_to")
+            keys = [line.strip().upper() for line in wanted.splitlines() if line.strip()]
+            if keys:
+                matched = units['VIN'].str.upper().isin(keys) | units['Stock Number'].str.upper().isin(keys)
+                batch_units = units[matched].assign(To=batch_to)
+                found = set(batch_units['VIN'].str.upper()) | set(batch_units['Stock Number'].str.upper())
+                batch_errors = [f"{key} isn't in {batch_source}" for key in keys if key not in found]
+        if batch_errors:
+            st.error("Left out of the batch:\n" + "\n".join(f"- {error}" for error in batch_errors))
+
+        batch_units = st.data_editor(
+            batch_units.reset_index(drop=True),
+            column_config={
+                'From': st.column_config.SelectboxColumn(options=trade_locations),
+                'To': st.column_config.SelectboxColumn(options=trade_locations),
+                'Projected Cost': st.column_config.NumberColumn(format="$%.2f"),
+            },
+            hide_index=True,
+            width='stretch',
+        )
+        batch_problems = trade_sheets.trade_unit_problems(batch_units)
+        if batch_problems:
+            st.error("Fix these rows before generating:\n" + "\n".join(f"- {problem}" for problem in batch_problems))
+        batch_output = st.radio("Output", ["One merged PDF", "ZIP of PDFs"], horizontal=True, key="batch_trade_output")
+        if st.button(f"Generate {len(batch_units)} Trade Sheets", key="generate_batch_trade_button",
+                     disabled=batch_units.empty or bool(batch_problems)):
+            with profile.stage('trade_sheets') as info:
+                sheets = trade_sheets.sheets_for_units(
+                    batch_units, date=formatted_date, manager=manager,
+                    our_trade=our_trade, their_trade=their_trade, sold=sold, floorplan=floorplan,
+                )
+                info['rows'] = len(sheets)
+                if batch_output == "ZIP of PDFs":
+                    batch_data, batch_name, batch_mime = trade_sheets.trade_sheets_zip(sheets), "dealer_trades.zip", "application/zip"
+                else:
+                    batch_data, batch_name, batch_mime = trade_sheets.trade_sheet_pdf(sheets), "dealer_trades.pdf", "application/pdf"
+            st.download_button(
+                label=f"Download {len(sheets)} Trade Sheets",
+                data=batch_data,
+                file_name=batch_name,
+                mime=batch_mime,
+                key="download_batch_trade_button"
+            )
+
 # Additional styling for dataframes in tabs
 dataframe_css = """
 <style>
@@ -1069,400 +1070,284 @@ dataframe_css = """
 """
 st.markdown(dataframe_css, unsafe_allow_html=True)
 
-def replace_mdl_with_full_name(df, reverse_mdl_mapping):
-    df['MDL'] = df['MDL'].replace(reverse_mdl_mapping)
-    return df
-
-@st.cache_data
-def summarize_incoming_data(df, start_date, end_date, all_models, all_dealers):
-    src = df.copy()
-    src['ETA'] = pd.to_datetime(src['ETA'], errors='coerce').dt.normalize()
-
-    # inclusive window for the passed month
-    start = pd.Timestamp(start_date.year, start_date.month, 1)
-    end   = pd.Timestamp(end_date.year, end_date.month, end_date.day)
-
-    filtered = src[(src['ETA'] >= start) & (src['ETA'] <= end)]
-
-    # exclude non-target dealers, then normalize names
-    filtered = filtered[~filtered['DEALER_NAME'].str.upper().isin(["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"])]
-    filtered['DEALER_NAME'] = filtered['DEALER_NAME'].replace(dealer_acronyms)
-
-    # robust de-duplication
-    filtered = add_unit_key(filtered)
-    filtered.sort_values(['DEALER_NAME', 'UNIT_KEY', 'ETA'], inplace=True)
-    filtered = filtered.drop_duplicates(subset=['DEALER_NAME','UNIT_KEY'], keep='last')
-
-    # model labels to full names, then canonical (e.g. PTHFINDR→PATHFINDER, NKX/N KICKS→KICKS)
-    filtered = replace_mdl_with_full_name(filtered, reverse_mdl_mapping)
-    filtered['MDL'] = filtered['MDL'].apply(norm_canonical_model)
-
-    combos = pd.MultiIndex.from_product([all_dealers, all_models], names=['DEALER_NAME','MDL'])
-    summary = (filtered
-        .groupby(['DEALER_NAME','MDL'])
-        .size()
-        .reindex(combos, fill_value=0)
-        .reset_index(name='Count'))
-
-    pivot = pd.pivot_table(
-        summary,
-        values='Count',
-        index='MDL',
-        columns='DEALER_NAME',
-        aggfunc='sum',
-        fill_value=0,
-        margins=True,
-        margins_name='Total'
+@profile()
+@st.cache_data(max_entries=4)
+def prepare_incoming_frame(_df, data_version):
+    """summaries.prepare_incoming_frame, computed once per data load; data_version keys the cache."""
+    return summaries.prepare_incoming_frame(_df)
+
+@profile()
+@st.cache_data(max_entries=8)
+def summarize_incoming_horizon(_df, data_version, start, buckets=3, freq='M'):
+    """summaries.summarize_incoming_horizon over the prepared frame, cached per horizon."""
+    return summaries.summarize_incoming_horizon(prepare_incoming_frame(_df, data_version), start, buckets, freq)
+
+@profile()
+@st.cache_data(max_entries=8)
+def render_incoming_tables(_df, data_version, _store_summaries, _formatted_90_day_sales, sales_version, start):
+    """HTML of the six Incoming tables for the month windows from start, cached as strings.
+
+    The visible models are derived from the same inputs, so data_version, sales_version and start
+    key everything the tables show; an unchanged tab reruns without touching a frame.
+    """
+    incoming_windows = summarize_incoming_horizon(_df, data_version, start)
+    current_month_summary, next_month_summary, following_month_summary = incoming_windows['incoming']
+    balance_to_arrive = incoming_windows['balance']
+    current_inventory_summary = summarize_current_inventory(_store_summaries)
+    # Only show models that have at least one non-zero in any of the six tables
+    visible_models = incoming_tab_visible_models(
+        current_month_summary,
+        next_month_summary,
+        following_month_summary,
+        balance_to_arrive,
+        _formatted_90_day_sales,
+        current_inventory_summary,
     )
-    return pivot
-
-def summarize_retailed_data(df, start_date, end_date, all_models, all_dealers):
-    df['SOLD'] = pd.to_datetime(df['SOLD'], errors='coerce')
-    filtered_df = df[(df['LOC'] == 'RETAILED')]
-    filtered_df = filtered_df[~filtered_df['DEALER_NAME'].str.upper().isin(["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"])]
-    filtered_df['DEALER_NAME'] = filtered_df['DEALER_NAME'].replace(dealer_acronyms)
-    filtered_df = replace_mdl_with_full_name(filtered_df, reverse_mdl_mapping)
-    all_combinations = pd.MultiIndex.from_product([all_dealers, all_models], names=['DEALER_NAME', 'MDL'])
-    summary = filtered_df.groupby(['DEALER_NAME', 'MDL']).size().reindex(all_combinations, fill_value=0).reset_index(name='Count')
-    pivot_table = pd.pivot_table(summary, values='Count', index='MDL', columns='DEALER_NAME', aggfunc='sum', fill_value=0, margins=True, margins_name='Total')
-    return pivot_table
-
-def summarize_current_inventory(dataframes):
-    series_by_store = {}
-    for store, df in dataframes.items():
-        if "Dlr Inventory" not in df.columns or df.empty:
-            continue
-        d = df.copy()
-        d["Model"] = d["Model"].apply(norm_canonical_model)
-        d = d[d["Model"].str.upper() != "TOTAL"]
-        d = d[~d["Model"].isin(["GT-R", "TITAN XD"])]
-        agg = d.groupby("Model", as_index=True)["Dlr Inventory"].sum()
-        series_by_store[store] = agg
-
-    if not series_by_store:
-        return pd.DataFrame(columns=["Model", "Total"])
-
-    combined_data = pd.concat(series_by_store, axis=1).fillna(0)
-    combined_data.columns = [dlr_acronyms.get(col, col) for col in combined_data.columns]
-    combined_data.reset_index(inplace=True)
-    combined_data["Total"] = combined_data.iloc[:, 1:].sum(axis=1)
-    combined_data = combined_data.sort_values("Model", key=lambda x: x.str.lower())
-    total_vals = combined_data.drop(columns=["Model"]).sum(numeric_only=True)
-    total_vals["Model"] = "Total"
-    combined_data = pd.concat([combined_data, pd.DataFrame([total_vals])], ignore_index=True)
-    return combined_data
-
-def summarize_dlv_date_data(df, start_date, end_date, all_models, all_dealers):
-    df['DLV_DATE'] = pd.to_datetime(df['DLV_DATE'], errors='coerce')
-    filtered_df = df[(df['DLV_DATE'] >= start_date) & (df['DLV_DATE'] <= end_date)]
-    filtered_df = filtered_df[~filtered_df['DEALER_NAME'].str.upper().isin(["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"])]
-    filtered_df['DEALER_NAME'] = filtered_df['DEALER_NAME'].replace(dealer_acronyms)
-    filtered_df = replace_mdl_with_full_name(filtered_df, reverse_mdl_mapping)
-    filtered_df['MDL'] = filtered_df['MDL'].apply(norm_canonical_model)
-    all_combinations = pd.MultiIndex.from_product([all_dealers, all_models], names=['DEALER_NAME', 'MDL'])
-    summary = filtered_df.groupby(['DEALER_NAME', 'MDL']).size().reindex(all_combinations, fill_value=0).reset_index(name='Count')
-    pivot_table = pd.pivot_table(summary, values='Count', index='MDL', columns='DEALER_NAME', aggfunc='sum', fill_value=0, margins=True, margins_name='Total')
-    return pivot_table
-
-def _model_has_any_nonzero_pivot(pivot_df, model):
-    """Return True if model row in pivot (index=MDL) has at least one non-zero value."""
-    if pivot_df.empty or model is None or str(model).upper() == "TOTAL":
-        return False
-    model_upper = str(model).upper()
-    match_idx = [i for i in pivot_df.index if str(i).strip().upper() == model_upper]
-    if not match_idx:
-        return False
-    row = pivot_df.loc[match_idx[0]]
-    return (row != 0).any() if hasattr(row, "__len__") else row != 0
-
-def _model_has_any_nonzero_model_col(df, model):
-    """Return True if model has at least one non-zero in the row (DataFrame with Model column)."""
-    if df.empty or model is None or str(model).upper() == "TOTAL":
-        return False
-    match = df[df["Model"].astype(str).str.upper() == str(model).upper()]
-    if match.empty:
-        return False
-    row = match.iloc[0]
-    numeric = row.drop(labels=["Model"], errors="ignore")
-    numeric = pd.to_numeric(numeric, errors="coerce").fillna(0)
-    return (numeric != 0).any()
-
-def incoming_tab_visible_models(
-    current_month_summary,
-    next_month_summary,
-    following_month_summary,
-    balance_to_arrive,
-    formatted_90_day_sales,
-    current_inventory_summary,
-):
-    """Return list of models that have at least one non-zero in any of the Incoming tab tables."""
-    candidates = set()  # use uppercase to avoid duplicate models
-    for pivot in (current_month_summary, next_month_summary, following_month_summary, balance_to_arrive):
-        if not pivot.empty and hasattr(pivot, "index"):
-            for m in pivot.index:
-                k = str(m).strip().upper()
-                if k != "TOTAL":
-                    candidates.add(k)
-    if not formatted_90_day_sales.empty and "Model" in formatted_90_day_sales.columns:
-        for m in formatted_90_day_sales["Model"].astype(str):
-            k = m.strip().upper()
-            if k != "TOTAL":
-                candidates.add(k)
-    if not current_inventory_summary.empty and "Model" in current_inventory_summary.columns:
-        for m in current_inventory_summary["Model"].astype(str):
-            k = m.strip().upper()
-            if k != "TOTAL":
-                candidates.add(k)
-    visible = [
-        m for m in candidates
-        if _model_has_any_nonzero_pivot(current_month_summary, m)
-        or _model_has_any_nonzero_pivot(next_month_summary, m)
-        or _model_has_any_nonzero_pivot(following_month_summary, m)
-        or _model_has_any_nonzero_pivot(balance_to_arrive, m)
-        or _model_has_any_nonzero_model_col(formatted_90_day_sales, m)
-        or _model_has_any_nonzero_model_col(current_inventory_summary, m)
-    ]
-    return sorted(visible, key=lambda x: x.upper())
-
-def dataframe_to_html(df):
-    html = df.to_html(classes='dataframe-container', border=0, index_names=False)
-    return html
-    
-def dataframe_to_html_90(df):
-    html = df.to_html(classes='dataframe-container', border=0, index=False)  # Set index=False
-    return html
-
-def reindex_table_to_match_models(df, models_to_match, index_col='MDL'):
-    """Reindex a dataframe to include all models from models_to_match, filling missing with zeros."""
-    if df.empty or not models_to_match:
-        return df
-    
-    try:
-        # Handle pivot tables with index (like incoming summaries)
-        if index_col in df.index.names or (hasattr(df.index, 'name') and df.index.name == index_col):
-            # Get current index values (excluding Total)
-            current_index = [str(m) for m in df.index if str(m).upper() != 'TOTAL']
-            # Create new index with models_to_match + Total if it existed
-            new_index = models_to_match.copy()
-            if 'Total' in df.index or any(str(m).upper() == 'TOTAL' for m in df.index):
-                new_index.append('Total')
-            
-            # Reindex to include all models, filling missing with 0
-            reindexed = df.reindex(new_index, fill_value=0)
-            return reindexed
-        
-        # Handle dataframes with 'Model' column (like 90-day sales and current inventory)
-        if 'Model' in df.columns:
-            # Get current models (excluding Total)
-            current_models = df[df['Model'].astype(str).str.upper() != 'TOTAL']['Model'].tolist()
-            # Create list of all models to show
-            all_models = models_to_match.copy()
-            # Check if Total row exists
-            has_total = any(df['Model'].astype(str).str.upper() == 'TOTAL')
-            
-            # Create a new dataframe with all models
-            result_rows = []
-            for model in all_models:
-                # Find matching row (case-insensitive)
-                matching = df[df['Model'].astype(str).str.upper() == str(model).upper()]
-                if not matching.empty:
-                    result_rows.append(matching.iloc[0].to_dict())
-                else:
-                    # Create zero row for missing model
-                    zero_row = {col: 0 if col != 'Model' else model for col in df.columns}
-                    result_rows.append(zero_row)
-            
-            # Add Total row if it existed
-            if has_total:
-                total_row = df[df['Model'].astype(str).str.upper() == 'TOTAL'].iloc[0].to_dict()
-                result_rows.append(total_row)
-            
-            result_df = pd.DataFrame(result_rows)
-            # Recalculate Total row if it exists
-            if has_total and len(result_df) > 0:
-                total_idx = result_df[result_df['Model'].astype(str).str.upper() == 'TOTAL'].index
-                if len(total_idx) > 0:
-                    numeric_cols = result_df.select_dtypes(include=[np.number]).columns
-                    result_df.loc[total_idx[0], numeric_cols] = result_df[result_df['Model'].astype(str).str.upper() != 'TOTAL'][numeric_cols].sum()
-            
-            return result_df
-        
-    except Exception as e:
-        # If reindexing fails, return original dataframe
-        return df
-    
-    return df
-
-with tab4:
-    container = st.container()
-    if not combined_data.empty:
-        today = datetime.today()
-        start_of_month = today.replace(day=1)
-        next_month_start = start_of_month + relativedelta(months=1)
-        following_month_start = start_of_month + relativedelta(months=2)
-        start_for_calc = start_of_month + relativedelta(months=3)
-        end_of_month = next_month_start - timedelta(days=1)
-        next_month_end = following_month_start - timedelta(days=1)
-        following_month_end = start_for_calc - timedelta(days=1)
-        # Streamlit Cloud cache hashing can choke on numpy arrays/Index objects; use tuples of strings.
-        all_models = tuple(
-            pd.Series(combined_data["MDL"])
-            .replace(reverse_mdl_mapping)
-            .apply(norm_canonical_model)
-            .astype(str)
-            .unique()
-            .tolist()
-        )
-        all_dealers = tuple(
-            pd.Series(combined_data["DEALER_NAME"])
-            .replace(dealer_acronyms)
-            .astype(str)
-            .loc[~combined_data["DEALER_NAME"].astype(str).str.upper().isin([d.upper() for d in excluded_dealers])]
-            .unique()
-            .tolist()
-        )
-        with container:
-            # Calculate balance_to_arrive first to get the models list
-            current_month_summary = summarize_incoming_data(combined_data, start_of_month, end_of_month, all_models, all_dealers)
-            current_month_dlv_summary = summarize_dlv_date_data(combined_data, start_of_month, end_of_month, all_models, all_dealers)
-            balance_to_arrive = current_month_summary.subtract(current_month_dlv_summary, fill_value=0)
-            
-            # Get next month and following month summaries and current inventory (needed for visible-models)
-            next_month_summary = summarize_incoming_data(combined_data, next_month_start, next_month_end, all_models, all_dealers)
-            following_month_summary = summarize_incoming_data(combined_data, following_month_start, following_month_end, all_models, all_dealers)
-            current_inventory_summary = summarize_current_inventory(store_summaries)
-            # Only show models that have at least one non-zero in any of the six tables
-            visible_models = incoming_tab_visible_models(
-                current_month_summary,
-                next_month_summary,
-                following_month_summary,
-                balance_to_arrive,
-                formatted_90_day_sales,
-                current_inventory_summary,
-            )
-
-            blank_col1, col1, col2, col3, blank_col2 = st.columns([0.1, 1, 1, 1, 0.1])
-            with col1:
-                st.markdown(f"<h5 style='text-align: center;'>Incoming for {start_of_month.strftime('%B')}</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    current_month_summary_filtered = reindex_table_to_match_models(current_month_summary, visible_models, 'MDL')
-                else:
-                    current_month_summary_filtered = current_month_summary
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html(current_month_summary_filtered)}</div>", unsafe_allow_html=True)
 
-                st.markdown(f"<h5 style='text-align: center;'>90-Day Sales Summary</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    formatted_90_day_sales_filtered = reindex_table_to_match_models(formatted_90_day_sales, visible_models, 'Model')
-                else:
-                    formatted_90_day_sales_filtered = formatted_90_day_sales
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html_90(formatted_90_day_sales_filtered)}</div>", unsafe_allow_html=True)
-
-            with col2:
-                st.markdown(f"<h5 style='text-align: center;'>Incoming for {next_month_start.strftime('%B')}</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    next_month_summary_filtered = reindex_table_to_match_models(next_month_summary, visible_models, 'MDL')
-                else:
-                    next_month_summary_filtered = next_month_summary
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html(next_month_summary_filtered)}</div>", unsafe_allow_html=True)
+    def render(table, index_col, to_html):
+        if visible_models:
+            table = reindex_table_to_match_models(table, visible_models, index_col)
+        return to_html(table)
+
+    return {
+        'current_month': render(current_month_summary, 'MDL', dataframe_to_html),
+        'next_month': render(next_month_summary, 'MDL', dataframe_to_html),
+        'following_month': render(following_month_summary, 'MDL', dataframe_to_html),
+        'balance_to_arrive': render(balance_to_arrive, 'MDL', dataframe_to_html),
+        'sales_90_day': render(_formatted_90_day_sales, 'Model', dataframe_to_html_90),
+        'current_inventory': render(current_inventory_summary, 'Model', dataframe_to_html_90),
+    }
 
-                st.markdown(f"<h5 style='text-align: center;'>Current Inventory</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    current_inventory_summary_filtered = reindex_table_to_match_models(current_inventory_summary, visible_models, 'Model')
-                else:
-                    current_inventory_summary_filtered = current_inventory_summary
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html_90(current_inventory_summary_filtered)}</div>", unsafe_allow_html=True)
+@profile()
+@st.cache_data(max_entries=8)
+def render_incoming_horizon(_df, data_version, start, buckets, freq):
+    """HTML of the horizon cube, models with nothing incoming dropped, cached per horizon."""
+    cube = summarize_incoming_horizon(_df, data_version, start, buckets, freq)['cube']
+    return dataframe_to_html(cube[(cube != 0).any(axis=1)])
 
-            with col3:
-                st.markdown(f"<h5 style='text-align: center;'>Incoming for {following_month_start.strftime('%B')}</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    following_month_summary_filtered = reindex_table_to_match_models(following_month_summary, visible_models, 'MDL')
-                else:
-                    following_month_summary_filtered = following_month_summary
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html(following_month_summary_filtered)}</div>", unsafe_allow_html=True)
+def incoming_table(title, html):
+    st.markdown(f"<h5 style='text-align: center;'>{title}</h5>", unsafe_allow_html=True)
+    st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{html}</div>", unsafe_allow_html=True)
 
-                st.markdown(f"<h5 style='text-align: center;'>Balance to Arrive for {start_of_month.strftime('%B')}</h5>", unsafe_allow_html=True)
-                if visible_models:
-                    balance_to_arrive_filtered = reindex_table_to_match_models(balance_to_arrive, visible_models, 'MDL')
-                else:
-                    balance_to_arrive_filtered = balance_to_arrive
-                st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{dataframe_to_html(balance_to_arrive_filtered)}</div>", unsafe_allow_html=True)
-    else:
-        st.error("No data to display.")
+with tab4:
+    if tab_is_open(tab4):
+        container = st.container()
+        if not combined_data.empty:
+            today = datetime.today()
+            start_of_month = today.replace(day=1)
+            next_month_start = start_of_month + relativedelta(months=1)
+            following_month_start = start_of_month + relativedelta(months=2)
+            with container:
+                # Month-aligned so the cache key is stable across reruns within the month
+                tables = render_incoming_tables(
+                    combined_data, data_version, store_summaries, formatted_90_day_sales, sales_version,
+                    pd.Timestamp(start_of_month.year, start_of_month.month, 1)
+                )
+
+                blank_col1, col1, col2, col3, blank_col2 = st.columns([0.1, 1, 1, 1, 0.1])
+                with col1:
+                    incoming_table(f"Incoming for {start_of_month.strftime('%B')}", tables['current_month'])
+                    incoming_table("90-Day Sales Summary", tables['sales_90_day'])
+
+                with col2:
+                    incoming_table(f"Incoming for {next_month_start.strftime('%B')}", tables['next_month'])
+                    incoming_table("Current Inventory", tables['current_inventory'])
+
+                with col3:
+                    incoming_table(f"Incoming for {following_month_start.strftime('%B')}", tables['following_month'])
+                    incoming_table(f"Balance to Arrive for {start_of_month.strftime('%B')}", tables['balance_to_arrive'])
+
+                with st.expander("📅 Incoming Horizon", expanded=False):
+                    hcol1, hcol2 = st.columns(2)
+                    with hcol1:
+                        granularity = remember("horizon_granularity", st.selectbox(
+                            "Bucket", options=list(horizon_granularities), key="horizon_granularity",
+                            index=remembered_index("horizon_granularity", list(horizon_granularities))
+                        ))
+                    with hcol2:
+                        horizon_buckets = remember("horizon_buckets", st.number_input(
+                            "Buckets", min_value=1, max_value=26, value=remembered("horizon_buckets", 6), step=1,
+                            key="horizon_buckets"
+                        ))
+                    horizon_html = render_incoming_horizon(
+                        combined_data, data_version, pd.Timestamp(today.year, today.month, today.day),
+                        int(horizon_buckets), horizon_granularities[granularity]
+                    )
+                    st.markdown(f"<div class='dataframe-container dataframe-container-incoming'>{horizon_html}</div>", unsafe_allow_html=True)
+        else:
+            st.error("No data to display.")
+
+# (metric column, chart title, y-axis label) of the Sales tab charts, in display order
+sales_chart_metrics = [
+    ('Units Sold Rolling Days 90', 'Sales Trends Over the Last 90 Days', 'Sold Roll 90'),
+    ('Units Sold-MTD', 'Month-to-Date Sales Performance', 'Sold-MTD'),
+    ('Dlr Days Supply', 'Inventory Levels (Days Supply)', 'Days Supply'),
+    ('Dlr Inventory', 'Dealer Inventory Comparison', 'Dlr Inventory'),
+]
+sales_chart_colors = ['#c3002f', '#8c8c8c', '#4d4d4d', '#d9d9d9']
+sales_chart_layout = dict(
+    xaxis_title='Model',
+    barmode='group',
+    plot_bgcolor='#0e1117',
+    paper_bgcolor='#0e1117',
+    font=dict(color='#d0d0d0')
+)
+sales_chart_config = {
+    'displayModeBar': False,
+    'staticPlot': False,
+    'scrollZoom': True,
+    'doubleClick': 'reset+autosize'
+}
 
-def plot_metric(dataframes, metric, title, ylabel):
+# Figures are cached as shared objects like the large frames; st.plotly_chart only serializes them.
+@profile()
+@st.cache_resource(max_entries=16)
+def metric_figure(_dataframes, sales_version, metric, title, ylabel):
+    """Grouped bar chart of metric per model, one trace per store; built once per 90-day data version."""
     fig = go.Figure()
-    
-    colors = ['#c3002f', '#8c8c8c', '#4d4d4d', '#d9d9d9']
-
-    for i, (name, df) in enumerate(dataframes.items()):
+    for i, (name, df) in enumerate(_dataframes.items()):
         fig.add_trace(go.Bar(
             x=df['Model'],
             y=df[metric],
             name=name,
-            marker=dict(color=colors[i])
+            marker=dict(color=sales_chart_colors[i])
         ))
+    fig.update_layout(title=title, yaxis_title=ylabel, **sales_chart_layout)
+    return fig
 
-    fig.update_layout(
-        title=title,
-        xaxis_title='Model',
-        yaxis_title=ylabel,
-        barmode='group',
-        plot_bgcolor='#0e1117',
-        paper_bgcolor='#0e1117',
-        font=dict(color='#d0d0d0')
-    )
-    
-    # Define configuration options
-    config = {
-        'displayModeBar': False,
-        'staticPlot': False,
-        'scrollZoom': True,
-        'doubleClick': 'reset+autosize'
-    }
-    
-    st.plotly_chart(fig, config=config)
+@profile()
+@st.cache_resource(max_entries=4)
+def sales_dashboard_figure(_dataframes, sales_version):
+    """All the Sales tab metrics in one grouped bar chart, picked with a dropdown in the browser.
+
+    Built from one long (Store, Model, Metric, Value) frame. The dropdown swaps the y values of the
+    store traces client-side, so changing metric sends nothing back to the script.
+    """
+    fig = go.Figure()
+    metric, title, ylabel = sales_chart_metrics[0]
+    fig.update_layout(title=title, yaxis_title=ylabel, **sales_chart_layout)
+    if not _dataframes:
+        return fig
+    metrics = [metric for metric, _, _ in sales_chart_metrics]
+    long = pd.concat(
+        [df[['Model', *metrics]].assign(Store=name) for name, df in _dataframes.items()], ignore_index=True
+    ).melt(id_vars=['Store', 'Model'], value_vars=metrics, var_name='Metric', value_name='Value')
+    series = {key: group for key, group in long.groupby(['Metric', 'Store'], sort=False)}
+    stores = list(_dataframes)
+    for i, store in enumerate(stores):
+        first = series[(metric, store)]
+        fig.add_trace(go.Bar(x=first['Model'], y=first['Value'], name=store, marker=dict(color=sales_chart_colors[i])))
+    buttons = [
+        dict(label=ylabel, method='update', args=[
+            {'y': [series[(metric, store)]['Value'].tolist() for store in stores]},
+            {'title.text': title, 'yaxis.title.text': ylabel},
+        ])
+        for metric, title, ylabel in sales_chart_metrics
+    ]
+    fig.update_layout(updatemenus=[dict(
+        buttons=buttons, direction='down', x=1, xanchor='right', y=1.15, yanchor='top',
+        bgcolor='#262730', bordercolor='#4d4d4d', font=dict(color='#d0d0d0')
+    )])
+    return fig
+
+def plot_metric(dataframes, metric, title, ylabel):
+    st.plotly_chart(metric_figure(dataframes, sales_version, metric, title, ylabel), config=sales_chart_config)
 
 with tab5:
-    st.markdown("### 📊 Sales Analytics & Trends")
-    def process_excel(file):
-        df = pd.read_html(file)[0].iloc[:, :9]
-        df.columns = df.iloc[1]
-        df = df.drop([0, 1])
-        df.columns = ['Model', 'Sold Roll 90', 'Sold-MTD', 'Dlr Invoice', 'Dlr Inventory', 'Days Supply',
-                      'Wholesale to Retail Dealer(avg days)', 'Wholesale to Retail District(avg days)', 'Wholesale to Retail Region(avg days)']
-        df['Model'] = df['Model'].astype(str)
-        numeric_columns = ['Sold Roll 90', 'Sold-MTD', 'Dlr Invoice', 'Dlr Inventory', 'Days Supply',
-                           'Wholesale to Retail Dealer(avg days)', 'Wholesale to Retail District(avg days)', 'Wholesale to Retail Region(avg days)']
-        df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
-        df = df.dropna(subset=['Model'])
-        return df
-    
-    # Load sales data with error handling
-    dataframes = {}
-    sales_files = {
-        'Concord': 'files/Concord90.xls',
-        'Hickory': 'files/Hickory90.xls',
-        'Lake': 'files/Lake90.xls',
-        'Winston': 'files/Winston90.xls'
-    }
+    if tab_is_open(tab5):
+        st.markdown("### 📊 Sales Analytics & Trends")
+        # Reuse the cached 90-day frames the Incoming tab already loaded, labelled with short store names
+        dataframes = {}
+        for store, file_path in store_files.items():
+            if not os.path.exists(file_path):
+                st.warning(f"⚠️ File not found: {file_path}")
+            elif not store_summaries[store].empty:
+                dataframes[dlr_acronyms[store].title()] = store_summaries[store]
     
-    for name, file_path in sales_files.items():
+        if not dataframes:
+            st.error("❌ No sales data files found. Please upload the 90-day sales files.")
+
+        single_chart = remember("sales_single_chart", st.toggle(
+            "Single chart with a metric dropdown", value=remembered("sales_single_chart", False), key="sales_single_chart"
+        ))
+        if single_chart:
+            bl1, col1, bl2 = st.columns([0.1, 2, 0.1])
+            with col1:
+                st.plotly_chart(sales_dashboard_figure(dataframes, sales_version), config=sales_chart_config)
+        else:
+            bl1, col1, col2, bl2 = st.columns([0.1, 1, 1, 0.1])
+            with col1:
+                for metric, title, ylabel in sales_chart_metrics[:2]:
+                    plot_metric(dataframes, metric, title, ylabel)
+
+            with col2:
+                for metric, title, ylabel in sales_chart_metrics[2:]:
+                    plot_metric(dataframes, metric, title, ylabel)
+
+@profile()
+@st.cache_data(max_entries=4)
+def build_inventory_changes(file_paths, fingerprints):
+    """Unit changes since each store's previous upload, or None when no store has an earlier upload."""
+    befores, afters, baselines = [], [], []
+    for file, fingerprint in zip(file_paths, fingerprints):
+        if not fingerprint:
+            continue
+        current = inventory_history.upload_id_for(file)
+        previous = inventory_history.previous_upload(file, current) if current else None
+        if previous is None:
+            continue
+        befores.append(inventory_history.load_upload(previous))
+        afters.append(inventory_history.load_upload(current))
+        baselines.append(file)
+    if not afters:
+        return None
+    delta = inventory_delta.diff_inventory(pd.concat(befores, ignore_index=True), pd.concat(afters, ignore_index=True))
+    return delta, baselines
+
+with tab6:
+    if tab_is_open(tab6):
+        st.markdown("### 🔁 Changes Since the Previous Upload")
         try:
-            if os.path.exists(file_path):
-                dataframes[name] = process_excel(file_path)
-            else:
-                st.warning(f"⚠️ File not found: {file_path}")
+            inventory_changes = build_inventory_changes(file_paths, inventory_fingerprints)
         except Exception as e:
-            st.warning(f"⚠️ Error processing {name}: {str(e)}")
-    
-    if not dataframes:
-        st.error("❌ No sales data files found. Please upload the 90-day sales files.")
-    
-    bl1, col1, col2, bl2 = st.columns([0.1, 1, 1, 0.1])
-    with col1:
-        plot_metric(dataframes, 'Sold Roll 90', 'Sales Trends Over the Last 90 Days', 'Sold Roll 90')
-        plot_metric(dataframes, 'Sold-MTD', 'Month-to-Date Sales Performance', 'Sold-MTD')
-    
-    with col2:
-        plot_metric(dataframes, 'Days Supply', 'Inventory Levels (Days Supply)', 'Days Supply')
-        plot_metric(dataframes, 'Dlr Inventory', 'Dealer Inventory Comparison', 'Dlr Inventory')
+            st.warning(f"⚠️ Could not compare uploads: {e}")
+            inventory_changes = None
+        if inventory_changes is None:
+            st.info("No earlier uploads to compare against yet. Changes appear after a store's inventory export is uploaded again.")
+        else:
+            delta, baselines = inventory_changes
+            counts = inventory_delta.summarize_delta(delta)
+            st.caption(f"Compared against the previous upload of: {', '.join(Path(b).stem for b in baselines)}")
+            cols = st.columns(6)
+            for col, (label, value) in zip(cols, [
+                ("Added", counts['added']), ("Removed", counts['removed']), ("Changed", counts['changed']),
+                ("Moved Dealer", counts['moved']), ("ETA Changed", counts['eta_changed']), ("Sold", counts['sold']),
+            ]):
+                col.metric(label, f"{value:,}")
+            st.markdown(f"**Added units ({counts['added']:,})**")
+            st.dataframe(delta['added'], hide_index=True, width='stretch', column_config=inventory_date_format,
+                         column_order=inventory_grid_columns(delta['added']))
+            st.markdown(f"**Removed units ({counts['removed']:,})**")
+            st.dataframe(delta['removed'], hide_index=True, width='stretch', column_config=inventory_date_format,
+                         column_order=inventory_grid_columns(delta['removed']))
+            st.markdown(f"**Changed values ({len(delta['changed']):,})**")
+            st.dataframe(delta['changed'], hide_index=True, width='stretch')
+
+# Where this run's time and memory went, stage by stage (only the open tab's stages run)
+with st.expander("🩺 Diagnostics", expanded=False):
+    if profiling.tracing_requested():
+        st.caption("Python allocation tracing is on for this server (TRACE_ALLOCATIONS), which slows every session.")
+    else:
+        st.caption("Start the app with TRACE_ALLOCATIONS=1 to add each stage's peak Python allocation (tracemalloc).")
+    stage_summary = profile.summary()
+    stage_summary['stage'] = ['↳ ' * depth + name for name, depth in zip(stage_summary['stage'], stage_summary['depth'])]
+    st.caption(f"This run: {profile.total_seconds():.3f} s over {len(profile.records)} stage call(s)")
+    st.dataframe(stage_summary.drop(columns='depth'), hide_index=True, width='stretch', column_config={
+        'seconds': st.column_config.NumberColumn('seconds', format='%.4f'),
+        'max_seconds': st.column_config.NumberColumn('slowest call (s)', format='%.4f'),
+        'rss_delta_mb': st.column_config.NumberColumn('RSS Δ (MB)', format='%.1f'),
+        'peak_rss_mb': st.column_config.NumberColumn('peak RSS (MB)', format='%.1f'),
+        'traced_peak_mb': st.column_config.NumberColumn('traced peak (MB)', format='%.1f'),
+    })
+    st.download_button("⬇️ Export JSON", profile.to_json(), file_name=f"profile_{profile.started_at:%Y%m%d_%H%M%S}.json",
+                       mime="application/json", on_click="ignore")
@@ -0,0 +1,72 @@
+"""Server-side sorting, search and paging for the large grids.
+
+Sorting is served from permutations computed once per column and direction, and search from a
+per-row text column built once per data load. A page is then a slice of row positions, so only the
+rows shown are ever taken from the frame (and serialized to the browser).
+"""
+import numpy as np
+import pandas as pd
+
+page_sizes = [100, 250, 500, 1000]
+
+def sort_order(values, descending=False):
+    """Row positions that sort values (missing last, ties in row order), like a stable sort_values.
+
+    Only the distinct values are sorted; the rows are ordered by a single integer argsort.
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    missing = codes < 0
+    if descending:
+        codes = len(uniques) - 1 - codes
+    return np.argsort(np.where(missing, len(uniques), codes), kind='stable')
+
+def _formatted_dates(values, date_format):
+    """values formatted with date_format (missing dates as ''), each distinct date formatted once."""
+    codes, uniques = pd.factorize(values)
+    formatted = np.append(uniques.strftime(date_format).to_numpy(dtype=object), '')
+    return pd.Series(formatted[codes], index=values.index, dtype='string')
+
+def search_text(df, columns, date_formats=None):
+    """Lower-cased text of every row over columns, for substring search.
+
+    Cells are joined with a separator a query can't contain, so a match never spans two cells.
+    date_formats maps a date column to the strftime format the grid displays it in, so a date is
+    found the way it reads on screen.
+    """
+    date_formats = date_formats or {}
+    text = None
+    for col in columns:
+        values = _formatted_dates(df[col], date_formats[col]) if col in date_formats else df[col]
+        values = values.astype('string').fillna('').str.lower()
+        text = values if text is None else text + '\x1f' + values
+    return text.reset_index(drop=True)
+
+def search_matches(text, query):
+    """Boolean mask of the rows whose text contains query (case-insensitive), or None for no query."""
+    query = query.strip().lower()
+    if not query:
+        return None
+    return text.str.contains(query, regex=False).to_numpy(dtype=bool)
+
+def select_rows(n_rows, positions=None, matches=None, order=None):
+    """Positions of the rows to show, in display order.
+
+    positions are the rows passing the filters (None for all), matches the search mask (None for
+    all) and order a permutation from sort_order (None keeps the frame order).
+    """
+    if positions is None:
+        keep = np.ones(n_rows, dtype=bool) if matches is None else matches
+    else:
+        keep = np.zeros(n_rows, dtype=bool)
+        keep[positions] = True
+        if matches is not None:
+            keep &= matches
+    return np.flatnonzero(keep) if order is None else order[keep[order]]
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+def page_of(rows, page, page_size):
+    """The positions on page (1-based) of rows."""
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
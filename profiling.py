@@ -0,0 +1,169 @@
+"""Per-stage timing and memory for one run of the app.
+
+main.py creates a Profile at the top of every run and wraps its loaders, summaries and chart
+functions in it; each call records wall time, process RSS before/after, the process RSS high-water
+mark and the output row count. With tracing on, the peak of Python allocations during the stage
+(tracemalloc) is recorded as well. tracemalloc is process-wide and slows allocation-heavy code
+several times over for every session of the server at once, so it is a server setting
+(TRACE_ALLOCATIONS=1 in the environment) rather than a per-session switch.
+"""
+import json, os, sys, time, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_mb = 1 << 20
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss_bytes():
+    """High-water mark of the process RSS so far, or None where it can't be read."""
+    if psutil is not None and hasattr(psutil.Process().memory_info(), 'peak_wset'):
+        return psutil.Process().memory_info().peak_wset  # Windows
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024  # bytes on macOS, kilobytes on Linux
+
+def count_rows(result):
+    """Rows in a stage's output: a frame's length, summed over the frames of a list/tuple/dict."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, dict):
+        result = list(result.values())
+    if isinstance(result, (list, tuple)):
+        counts = [count_rows(value) for value in result if isinstance(value, (pd.DataFrame, pd.Series, dict, list, tuple))]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+def tracing_requested():
+    """True when the server was started with TRACE_ALLOCATIONS set to 1/true/yes/on."""
+    return os.environ.get('TRACE_ALLOCATIONS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def set_tracing(enabled):
+    """Turn tracemalloc on or off for the process (no-op when it is already in that state)."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def _mb_or_none(value):
+    return None if value is None else round(value / _mb, 2)
+
+class Profile:
+    """The stage calls of one run; each record has its start offset and nesting depth."""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.records = []
+        self._stack = []  # per open stage: highest traced peak seen in its finished children
+
+    @contextmanager
+    def stage(self, name):
+        """Record the wall time and memory of the enclosed block as stage name.
+
+        Yields a dict; set its 'rows' to report an output size the stage doesn't return.
+        """
+        info = {'rows': None}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            traced_start = tracemalloc.get_traced_memory()[0]
+            if self._stack:
+                # The parent's peak so far, since the reset below forgets it
+                self._stack[-1] = max(self._stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append(0)
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = rss_bytes()
+            child_peak = self._stack.pop()
+            traced_peak = None
+            if tracing and tracemalloc.is_tracing():
+                peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+                traced_peak = peak - traced_start
+                if self._stack:
+                    self._stack[-1] = max(self._stack[-1], peak)
+            self.records.append({
+                'stage': name,
+                'start_seconds': round(start - self._start, 6),
+                'depth': len(self._stack),
+                'seconds': round(seconds, 6),
+                'rows': info['rows'],
+                'rss_mb': _mb_or_none(rss_after),
+                'rss_delta_mb': _mb_or_none(rss_after - rss_before) if None not in (rss_before, rss_after) else None,
+                'peak_rss_mb': _mb_or_none(peak_rss_bytes()),
+                'traced_peak_mb': _mb_or_none(traced_peak),
+            })
+
+    def wrap(self, fn, name=None):
+        """fn, recording every call as a stage (named after fn unless name is given)."""
+        name = name or fn.__name__
+
+        @wraps(fn)
+        def profiled(*args, **kwargs):
+            with self.stage(name) as info:
+                result = fn(*args, **kwargs)
+                info['rows'] = count_rows(result)
+                return result
+        return profiled
+
+    def __call__(self, name=None):
+        """Decorator form of wrap: @profile() or @profile('stage name')."""
+        return lambda fn: self.wrap(fn, name)
+
+    def stages(self):
+        """The records in the order the stages started (a stage before the ones nested in it)."""
+        return sorted(self.records, key=lambda record: record['start_seconds'])
+
+    def total_seconds(self):
+        return time.perf_counter() - self._start
+
+    def summary(self):
+        """One row per stage name, in start order: calls, total and slowest call, rows of the last call, worst memory figures."""
+        if not self.records:
+            return pd.DataFrame(columns=['stage', 'depth', 'calls', 'seconds', 'max_seconds', 'rows',
+                                         'rss_delta_mb', 'peak_rss_mb', 'traced_peak_mb'])
+        df = pd.DataFrame(self.stages())
+        return df.groupby('stage', sort=False).agg(
+            depth=('depth', 'min'),
+            calls=('seconds', 'size'),
+            seconds=('seconds', 'sum'),
+            max_seconds=('seconds', 'max'),
+            rows=('rows', 'last'),
+            rss_delta_mb=('rss_delta_mb', 'max'),
+            peak_rss_mb=('peak_rss_mb', 'max'),
+            traced_peak_mb=('traced_peak_mb', 'max'),
+        ).reset_index().astype({'rows': 'Int64'})
+
+    def to_json(self):
+        """The run as JSON: when it started, its total time so far, and every stage call."""
+        return json.dumps({
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_seconds': round(self.total_seconds(), 6),
+            'tracing': tracemalloc.is_tracing(),
+            'stages': self.stages(),
+        }, indent=2)
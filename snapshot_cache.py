@@ -0,0 +1,156 @@
+import hashlib, importlib.util, json, logging, os, tempfile
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Parsed frames are kept as Parquet next to a small JSON manifest per source file.
+# Bump SNAPSHOT_VERSION whenever the parse/transform output changes so stale snapshots are ignored.
+SNAPSHOT_VERSION = 5
+snapshot_dir = Path("snapshots")
+
+def file_fingerprint(file_path):
+    """Return (path, mtime_ns, size) for file_path, or None if it does not exist.
+
+    Cheap enough to take on every rerun; used as the cache key for everything derived from the file.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (str(file_path), stat.st_mtime_ns, stat.st_size)
+
+def dataset_version(fingerprints):
+    """Short token for a set of source files; changes whenever any of their fingerprints does.
+
+    Passed to cached functions in place of the frames built from those files, so Streamlit hashes
+    a few bytes instead of the whole DataFrame on every lookup.
+    """
+    return hashlib.sha1(repr(tuple(fingerprints)).encode()).hexdigest()[:16]
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+@lru_cache(maxsize=None)
+def parquet_available():
+    """Whether pandas has a Parquet engine for the snapshots; without one they are off, which is logged once."""
+    if any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")):
+        return True
+    log.warning("Neither pyarrow nor fastparquet is installed: snapshots are disabled and every source "
+                "file is parsed again after each restart (pip install pyarrow).")
+    return False
+
+def _snapshot_name(file_path, namespace):
+    resolved = str(Path(file_path).resolve())
+    return f"{namespace}_{Path(file_path).stem}_{hashlib.md5(resolved.encode()).hexdigest()[:8]}"
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, write):
+    # A temp file of its own per call: sessions are threads of one process and may write the same snapshot
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(Path(tmp))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def snapshot_path(file_path, namespace="inventory"):
+    """Return the path of a current snapshot for file_path, or None if it has to be re-parsed.
+
+    The snapshot is keyed by path + mtime + size; if those moved but the content hash did not
+    (e.g. the same export was re-uploaded) the snapshot is still reused.
+    """
+    stat = os.stat(file_path)
+    name = _snapshot_name(file_path, namespace)
+    manifest_path = snapshot_dir / f"{name}.json"
+    manifest = _read_manifest(manifest_path)
+    if manifest.get("version") != SNAPSHOT_VERSION or not manifest.get("sha256"):
+        return None
+    data_path = snapshot_dir / f"{name}-{manifest['sha256'][:16]}.parquet"
+    if not data_path.exists():
+        return None
+    if manifest.get("mtime_ns") == stat.st_mtime_ns and manifest.get("size") == stat.st_size:
+        return data_path
+    if file_digest(file_path) != manifest["sha256"]:
+        return None
+    try:
+        manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _write_atomic(manifest_path, lambda p: p.write_text(json.dumps(manifest)))
+    except OSError:
+        pass
+    return data_path
+
+# Sources that left no snapshot, by (namespace, fingerprint) → (error, whether parsing itself
+# failed). Kept for the life of the server; a changed file has a new fingerprint and is tried again.
+_failures = {}
+
+class ParseFailed(Exception):
+    """The current version of a source file already failed to parse; raised instead of parsing it again."""
+
+def record_failure(file_path, namespace, error, parse_failed):
+    _failures[(namespace, file_fingerprint(file_path))] = (str(error), parse_failed)
+
+def recorded_failure(file_path, namespace="inventory"):
+    """(error, parse_failed) recorded for the current version of file_path, or None."""
+    return _failures.get((namespace, file_fingerprint(file_path)))
+
+def load_or_parse(file_path, parser, namespace="inventory"):
+    """Return parser(file_path), reusing the on-disk snapshot when the source file is unchanged.
+
+    Raises ParseFailed for a file whose current version already failed to parse.
+    """
+    stat = os.stat(file_path)
+    data_path = snapshot_path(file_path, namespace) if parquet_available() else None
+    if data_path is not None:
+        try:
+            return pd.read_parquet(data_path)
+        except Exception:
+            pass  # unreadable snapshot: fall through and re-parse
+
+    failure = recorded_failure(file_path, namespace)
+    if failure is not None and failure[1]:
+        raise ParseFailed(failure[0])
+    try:
+        df = parser(file_path)
+    except Exception as e:
+        record_failure(file_path, namespace, e, parse_failed=True)
+        raise
+    if df is None or not parquet_available():
+        return df
+    try:
+        save_snapshot(file_path, df, namespace, stat=stat)
+    except Exception as e:
+        # caching is best-effort (read-only disk, no pyarrow, ...)
+        record_failure(file_path, namespace, e, parse_failed=False)
+    return df
+
+def save_snapshot(file_path, df, namespace="inventory", stat=None):
+    """Write df as the snapshot for file_path and drop any older snapshot of the same file."""
+    stat = stat or os.stat(file_path)
+    snapshot_dir.mkdir(exist_ok=True)
+    name = _snapshot_name(file_path, namespace)
+    digest = file_digest(file_path)
+    data_path = snapshot_dir / f"{name}-{digest[:16]}.parquet"
+    _write_atomic(data_path, lambda p: df.to_parquet(p))
+    for old in snapshot_dir.glob(f"{name}-*.parquet"):
+        if old != data_path:
+            old.unlink(missing_ok=True)
+    manifest = {
+        "source": str(file_path), "version": SNAPSHOT_VERSION,
+        "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest,
+    }
+    _write_atomic(snapshot_dir / f"{name}.json", lambda p: p.write_text(json.dumps(manifest)))
@@ -0,0 +1,338 @@
+"""Incoming and Sales tab tables: arrivals by month or ETA horizon, 90-day sales, current inventory, and their HTML.
+
+main.py wraps the expensive ones in st.cache_data; benchmarks/bench_pipeline.py calls them directly.
+"""
+from html import escape
+import numpy as np
+import pandas as pd
+from ingest import dealer_acronyms, reverse_mdl_mapping
+
+dlr_acronyms = {
+    'Concord': 'CONCORD', 'Hickory': 'HICKORY', 'Lake Norman': 'LAKE',
+    'Winston-Salem': 'WINSTON'
+}
+
+excluded_dealers = ["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"]
+
+def summarize_90_day_sales_by_store(store_summaries):
+    """Long (Model, Dealer, Units Sold Rolling Days 90) frame over every store's 90-day sales."""
+    filtered_summaries = {
+        store: df for store, df in store_summaries.items()
+        if store.upper() != "NISSAN OF BOONE" and store.upper() != "EAST CHARLTOTE NISSAN" and not df.empty
+    }
+    # Group by the canonical model names (e.g. PTHFINDR→PATHFINDER, NKX/N KICKS→KICKS) so one row per model
+    def store_agg(df):
+        return df["Units Sold Rolling Days 90"].groupby(df["MDL_CANON"].rename("Model")).sum().to_frame()
+    all_stores_summary = pd.concat(
+        {store: store_agg(df) for store, df in filtered_summaries.items()},
+        axis=1
+    ).fillna(0)
+    all_stores_summary.columns = all_stores_summary.columns.get_level_values(0)
+    all_stores_summary.reset_index(inplace=True)
+    summary_long = all_stores_summary.melt(
+        id_vars=["Model"],
+        var_name="Dealer",
+        value_name="Units Sold Rolling Days 90"
+    )
+    return summary_long
+
+def format_90_day_sales(summary_90_day_sales):
+    """Model x store pivot of the 90-day sales, with a Total column and row."""
+    formatted_summary = summary_90_day_sales.pivot_table(
+        values="Units Sold Rolling Days 90",
+        index="Model",
+        columns="Dealer",
+        aggfunc="sum",
+        fill_value=0
+    )
+    formatted_summary["Total"] = formatted_summary.sum(axis=1)
+    formatted_summary = formatted_summary.reset_index()
+    formatted_summary = formatted_summary[~formatted_summary["Model"].isin(["GT-R", "TITAN XD", "TOTAL"])]
+    formatted_summary.columns = [
+        dlr_acronyms.get(col, col) if col != "Model" else col
+        for col in formatted_summary.columns
+    ]
+    total_row = formatted_summary.drop(columns=["Model"]).sum(numeric_only=True)
+    total_row["Model"] = "Total"
+    formatted_summary = formatted_summary.sort_values(
+        by="Model",
+        key=lambda x: x.str.lower() if x.name == "Model" else x,
+        ignore_index=True
+    )
+    formatted_summary = pd.concat(
+        [formatted_summary, pd.DataFrame([total_row])],
+        ignore_index=True
+    )
+    return formatted_summary
+
+def replace_mdl_with_full_name(df, reverse_mdl_mapping):
+    return df.assign(MDL=df['MDL'].astype(str).replace(reverse_mdl_mapping))
+
+def prepare_incoming_frame(df):
+    """combined_data reduced to what the Incoming tables need.
+
+    Returns (frame, all_models, all_dealers): non-target dealers dropped, DEALER_NAME as acronyms,
+    MDL as canonical full names (the DEALER_SHORT / MDL_CANON columns materialized at load). Units
+    are already deduped at parse time, so nothing is re-sorted here.
+    """
+    dealers = df['DEALER_NAME'].astype(str)
+    frame = pd.DataFrame({
+        'DEALER_NAME': df['DEALER_SHORT'].astype(str),
+        'MDL': df['MDL_CANON'].astype(str),
+        'ETA': df['ETA'],
+        'DLV_DATE': df['DLV_DATE'],
+    })
+    all_models = tuple(frame['MDL'].unique().tolist())
+    frame = frame[~dealers.str.upper().isin([d.upper() for d in excluded_dealers])]
+    all_dealers = tuple(frame['DEALER_NAME'].unique().tolist())
+    return frame, all_models, all_dealers
+
+def _periods_from(dates, start_period):
+    """Whole periods (of start_period's frequency) from start_period to each date.
+
+    A missing date is -1, i.e. before start_period, so it falls outside every bucket.
+    """
+    periods = dates.dt.to_period(start_period.freqstr).array.asi8 - start_period.ordinal
+    return np.where(dates.isna().to_numpy(), -1, periods)
+
+def dealer_model_pivot(counts, all_models, all_dealers):
+    """MDL x dealer pivot (with Total row/column) of a (DEALER_NAME, MDL) count Series, zero-filled."""
+    combos = pd.MultiIndex.from_product([all_dealers, all_models], names=['DEALER_NAME', 'MDL'])
+    summary = counts.reindex(combos, fill_value=0).reset_index(name='Count')
+    return pd.pivot_table(
+        summary,
+        values='Count',
+        index='MDL',
+        columns='DEALER_NAME',
+        aggfunc='sum',
+        fill_value=0,
+        margins=True,
+        margins_name='Total'
+    )
+
+# Incoming horizon granularities: label → pandas period frequency (weeks run Monday–Sunday)
+horizon_granularities = {'Month': 'M', 'Week': 'W'}
+
+def horizon_label(period):
+    return period.strftime('%B %Y') if period.freqstr == 'M' else f"Week of {period.start_time:%m-%d}"
+
+def summarize_incoming_horizon(prepared, start, buckets=3, freq='M'):
+    """All Incoming pivots for a horizon of buckets weeks or months from one groupby over the prepared frame.
+
+    prepared is the prepare_incoming_frame result. Each unit is binned into its ETA period (0 = the
+    period containing start, up to buckets - 1) and, if it was delivered in the first period, into
+    the delivered bucket as well. Returns a dict with 'periods', 'incoming' (one pivot per period),
+    'delivered', 'balance' (incoming minus delivered for the first period) and 'cube', the incoming
+    pivots side by side under their period labels.
+    """
+    frame, all_models, all_dealers = prepared
+    start_period = pd.Period(start, freq)
+    eta_bucket = _periods_from(frame['ETA'], start_period)
+    delivered = buckets  # bucket id for "delivered in the first period", after the ETA periods
+    bucket = np.concatenate([
+        np.where((eta_bucket >= 0) & (eta_bucket < buckets), eta_bucket, -1),
+        np.where(_periods_from(frame['DLV_DATE'], start_period) == 0, delivered, -1),
+    ])
+    keys = pd.DataFrame({
+        'BUCKET': bucket,
+        'DEALER_NAME': np.tile(frame['DEALER_NAME'].to_numpy(), 2),
+        'MDL': np.tile(frame['MDL'].to_numpy(), 2),
+    })
+    counts = keys[keys['BUCKET'] >= 0].groupby(['BUCKET', 'DEALER_NAME', 'MDL']).size()
+    present = set(counts.index.get_level_values('BUCKET'))
+
+    def pivot_for(b):
+        selected = counts.xs(b, level='BUCKET') if b in present else counts.iloc[:0].droplevel('BUCKET')
+        return dealer_model_pivot(selected, all_models, all_dealers)
+
+    periods = pd.period_range(start_period, periods=buckets)
+    incoming = [pivot_for(b) for b in range(buckets)]
+    delivered_pivot = pivot_for(delivered)
+    return {
+        'periods': periods,
+        'incoming': incoming,
+        'delivered': delivered_pivot,
+        'balance': incoming[0].subtract(delivered_pivot, fill_value=0),
+        'cube': pd.concat({horizon_label(p): pivot for p, pivot in zip(periods, incoming)}, axis=1),
+    }
+
+def summarize_retailed_data(df, start_date, end_date, all_models, all_dealers):
+    # Only the two grouped columns of the retailed rows are taken; combined_data itself is left as is
+    filtered_df = df.loc[df['LOC'] == 'RETAILED', ['DEALER_NAME', 'MDL']]
+    filtered_df = filtered_df[~filtered_df['DEALER_NAME'].str.upper().isin(["NISSAN OF BOONE", "EAST CHARLOTTE NISSAN"])]
+    filtered_df = filtered_df.assign(DEALER_NAME=filtered_df['DEALER_NAME'].astype(str).replace(dealer_acronyms))
+    filtered_df = replace_mdl_with_full_name(filtered_df, reverse_mdl_mapping)
+    all_combinations = pd.MultiIndex.from_product([all_dealers, all_models], names=['DEALER_NAME', 'MDL'])
+    summary = filtered_df.groupby(['DEALER_NAME', 'MDL']).size().reindex(all_combinations, fill_value=0).reset_index(name='Count')
+    pivot_table = pd.pivot_table(summary, values='Count', index='MDL', columns='DEALER_NAME', aggfunc='sum', fill_value=0, margins=True, margins_name='Total')
+    return pivot_table
+
+def summarize_current_inventory(dataframes):
+    series_by_store = {}
+    for store, df in dataframes.items():
+        if "Dlr Inventory" not in df.columns or df.empty:
+            continue
+        model = df["MDL_CANON"].rename("Model")
+        keep = (model.str.upper() != "TOTAL") & ~model.isin(["GT-R", "TITAN XD"])
+        series_by_store[store] = df.loc[keep, "Dlr Inventory"].groupby(model[keep]).sum()
+
+    if not series_by_store:
+        return pd.DataFrame(columns=["Model", "Total"])
+
+    combined_data = pd.concat(series_by_store, axis=1).fillna(0)
+    combined_data.columns = [dlr_acronyms.get(col, col) for col in combined_data.columns]
+    combined_data.reset_index(inplace=True)
+    combined_data["Total"] = combined_data.iloc[:, 1:].sum(axis=1)
+    combined_data = combined_data.sort_values("Model", key=lambda x: x.str.lower())
+    total_vals = combined_data.drop(columns=["Model"]).sum(numeric_only=True)
+    total_vals["Model"] = "Total"
+    combined_data = pd.concat([combined_data, pd.DataFrame([total_vals])], ignore_index=True)
+    return combined_data
+
+def _nonzero_by_model(df, keys):
+    """Series keys → whether that row has any non-zero numeric value; the first row wins for repeated keys."""
+    numeric = df.apply(pd.to_numeric, errors="coerce").fillna(0)
+    nonzero = pd.Series((numeric.to_numpy() != 0).any(axis=1), index=keys)
+    return nonzero[~nonzero.index.duplicated()]
+
+def incoming_tab_visible_models(
+    current_month_summary,
+    next_month_summary,
+    following_month_summary,
+    balance_to_arrive,
+    formatted_90_day_sales,
+    current_inventory_summary,
+):
+    """Return list of models that have at least one non-zero in any of the Incoming tab tables."""
+    candidates = []  # upper-cased keys, so case variants collapse to one model
+    nonzero = []
+    for pivot in (current_month_summary, next_month_summary, following_month_summary, balance_to_arrive):
+        if not pivot.empty:
+            keys = pivot.index.astype(str).str.strip().str.upper()
+            candidates.append(keys)
+            nonzero.append(_nonzero_by_model(pivot, keys))
+    for table in (formatted_90_day_sales, current_inventory_summary):
+        if not table.empty and "Model" in table.columns:
+            models = table["Model"].astype(str)
+            candidates.append(pd.Index(models.str.strip().str.upper()))
+            nonzero.append(_nonzero_by_model(table.drop(columns="Model"), pd.Index(models.str.upper())))
+    if not candidates:
+        return []
+    candidates = candidates[0].append(candidates[1:]).unique()
+    candidates = candidates[candidates != "TOTAL"]
+    # One combined mask: a model is visible when any table has a non-zero row for it
+    any_nonzero = pd.concat(nonzero).groupby(level=0).any()
+    visible = candidates[any_nonzero.reindex(candidates, fill_value=False).to_numpy(dtype=bool)]
+    return sorted(visible, key=lambda x: x.upper())
+
+def _html_cells(values):
+    return [escape(str(value), quote=False) for value in values.tolist()]
+
+def _plain_html_values(values):
+    """True for values to_html prints as plain str(): integers, or text without missing values."""
+    return pd.api.types.infer_dtype(values, skipna=False) in ('integer', 'string') and not values.hasnans
+
+def html_table(df, index=True):
+    """The <table> df.to_html(classes='dataframe-container', border=0) emits (index_names=False, or index=False), built directly.
+
+    Covers the Incoming and Sales tables (integer or text cells, a flat index, one or two header
+    rows) in a fraction of to_html's time; anything else (floats, missing values, deeper headers)
+    goes through to_html itself.
+    """
+    text_columns = [i for i, dtype in enumerate(df.dtypes) if not pd.api.types.is_integer_dtype(dtype)]
+    plain = (
+        df.shape[1] and df.columns.nlevels <= 2
+        and (df.index.nlevels == 1 if index else not any(df.columns.names))
+        and all(_plain_html_values(df.iloc[:, i]) for i in text_columns)
+        and all(_plain_html_values(df.columns.get_level_values(level)) for level in range(df.columns.nlevels))
+        and (not index or _plain_html_values(df.index))
+    )
+    if not plain:
+        if index:
+            return df.to_html(classes='dataframe-container', border=0, index_names=False)
+        return df.to_html(classes='dataframe-container', border=0, index=False)
+    corner = ['      <th></th>'] if index else []
+    lines = ['<table class="dataframe dataframe-container">', '  <thead>']
+    if df.columns.nlevels == 2:
+        # Top header row: runs of equal labels collapse into one spanning cell
+        top = _html_cells(df.columns.get_level_values(0))
+        lines += ['    <tr>'] + corner
+        start = 0
+        for end in range(1, len(top) + 1):
+            if end == len(top) or top[end] != top[start]:
+                span = end - start
+                lines.append(f'      <th colspan="{span}" halign="left">{top[start]}</th>' if span > 1 else f'      <th>{top[start]}</th>')
+                start = end
+        lines += ['    </tr>', '    <tr>'] + corner
+    else:
+        lines += ['    <tr style="text-align: right;">'] + corner
+    lines += [f'      <th>{label}</th>' for label in _html_cells(df.columns.get_level_values(-1))]
+    lines += ['    </tr>', '  </thead>', '  <tbody>']
+    rows = df.to_numpy(dtype=object).tolist()
+    for row in rows:
+        for i in text_columns:
+            row[i] = escape(row[i], quote=False)
+    labels = _html_cells(df.index) if index else None
+    for n, row in enumerate(rows):
+        lines.append('    <tr>')
+        if index:
+            lines.append(f'      <th>{labels[n]}</th>')
+        lines.extend([f'      <td>{value}</td>' for value in row])
+        lines.append('    </tr>')
+    lines += ['  </tbody>', '</table>']
+    return '\n'.join(lines)
+
+def dataframe_to_html(df):
+    return html_table(df)
+
+def dataframe_to_html_90(df):
+    return html_table(df, index=False)
+
+def reindex_table_to_match_models(df, models_to_match, index_col='MDL'):
+    """Reindex a dataframe to include all models from models_to_match, filling missing with zeros."""
+    if df.empty or not models_to_match:
+        return df
+
+    try:
+        # Handle pivot tables with index (like incoming summaries)
+        if index_col in df.index.names or (hasattr(df.index, 'name') and df.index.name == index_col):
+            # Create new index with models_to_match + Total if it existed
+            new_index = models_to_match.copy()
+            if (df.index.astype(str).str.upper() == 'TOTAL').any():
+                new_index.append('Total')
+
+            # Reindex to include all models, filling missing with 0
+            reindexed = df.reindex(new_index, fill_value=0)
+            return reindexed
+
+        # Handle dataframes with 'Model' column (like 90-day sales and current inventory)
+        if 'Model' in df.columns:
+            keys = df['Model'].astype(str).str.upper()
+            # Join on the upper-cased model name; the first row wins for repeated names
+            by_key = df[~keys.duplicated()].set_index(keys[~keys.duplicated()])
+            wanted = pd.Index([str(model).upper() for model in models_to_match])
+            result_df = by_key.reindex(wanted)
+            missing = ~wanted.isin(by_key.index)
+            # Zero rows for models this table doesn't have
+            result_df.loc[missing, result_df.columns.drop('Model')] = 0
+            result_df.loc[missing, 'Model'] = [m for m, miss in zip(models_to_match, missing) if miss]
+            has_total = 'TOTAL' in by_key.index
+            if has_total:
+                result_df = pd.concat([result_df, by_key.loc[['TOTAL']]])
+            dtypes = df.dtypes.to_dict()
+            if missing.all() and not has_total:
+                # Nothing came from df, so the numeric columns hold only the integer zeros
+                dtypes.update({col: 'int64' for col in df.select_dtypes(include=[np.number]).columns})
+            result_df = result_df.reset_index(drop=True).astype(dtypes)
+            # Recalculate Total row if it exists
+            if has_total:
+                numeric_cols = result_df.select_dtypes(include=[np.number]).columns
+                result_df.loc[len(result_df) - 1, numeric_cols] = result_df.iloc[:-1][numeric_cols].sum()
+
+            return result_df
+
+    except Exception as e:
+        # If reindexing fails, return original dataframe
+        return df
+
+    return df
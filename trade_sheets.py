@@ -0,0 +1,300 @@
+"""Dealer trade sheet PDFs, for the single-sheet form and for batches of units (CDK, all stores or a CSV).
+
+A sheet is a dict of the Dealer Trade form's fields (blank_sheet lists them). The fixed part of the
+page (grey section bars, labels, the MCO address block) is drawn once per document as a reportlab
+form and stamped on every page, so a sheet only adds its own values. A batch becomes one merged
+PDF, or a ZIP of one PDF per sheet built in parallel worker processes.
+"""
+import multiprocessing, os, re, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import pandas as pd
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from ingest import dealer_acronyms, reverse_mdl_mapping
+
+store_numbers = {
+    "MODERN NISSAN OF CONCORD": "STORE #3",
+    "MODERN NISSAN OF WINSTON": "STORE #2",
+    "MODERN NISSAN OF LAKE NORMAN": "STORE #6",
+    "MODERN NISSAN OF HICKORY": "STORE #11"
+}
+trade_locations = list(store_numbers)
+# DEALER_SHORT of the inventory exports and COMPANY of the CDK sheet → trade location
+location_by_dealer = {
+    'CONCORD': "MODERN NISSAN OF CONCORD", 'WINSTON': "MODERN NISSAN OF WINSTON",
+    'LAKE': "MODERN NISSAN OF LAKE NORMAN", 'HICKORY': "MODERN NISSAN OF HICKORY"
+}
+location_by_company = {int(number.split('#')[1]): location for location, number in store_numbers.items()}
+
+def _location_aliases():
+    """Upper-cased names a store goes by in uploads → trade location: its full and short names, its
+    store number written as STORE #3, #3 or 3, and its names in the inventory exports."""
+    aliases = {}
+    for location, number in store_numbers.items():
+        short = location.removeprefix("MODERN NISSAN OF ")
+        digits = number.split('#')[1]
+        aliases.update(dict.fromkeys([location, short, number, f"#{digits}", digits], location))
+    aliases.update(location_by_dealer)
+    aliases.update({name: location_by_dealer[short] for name, short in dealer_acronyms.items()})
+    aliases.update({"WINSTON-SALEM": "MODERN NISSAN OF WINSTON", "WINSTON SALEM": "MODERN NISSAN OF WINSTON"})
+    return aliases
+
+location_aliases = _location_aliases()
+
+# Batches smaller than this are built in-process; a worker pool costs more than it saves
+min_parallel_sheets = 64
+
+def format_currency(value):
+    return "${:,.2f}".format(value)
+
+def get_store_number(location):
+    return store_numbers.get(location, "UNKNOWN STORE")
+
+def trade_location(name):
+    """The trade location name refers to (any of location_aliases, in any case), or None."""
+    return location_aliases.get(' '.join(str(name).upper().split()))
+
+def blank_sheet(**values):
+    """A sheet with every field empty (unticked, $0.00), updated with values."""
+    sheet = {
+        'date': '', 'manager': '',
+        'our_trade': False, 'their_trade': False, 'sold': False, 'floorplan': False,
+        'from_location': '', 'to_location': '',
+        'stock_number': '', 'year_make_model': '', 'full_vin': '', 'projected_cost': 0.0,
+        'dealership_name': '', 'address': '', 'city_state_zip': '', 'phone_number': '',
+        'dealer_code': '', 'contact_name': '',
+        'outgoing_stock_number': '', 'outgoing_year_make_model': '', 'outgoing_full_vin': '',
+        'outgoing_sale_price': '', 'outgoing_projected_cost': 0.0,
+        'incoming_year_make_model': '', 'incoming_full_vin': '', 'incoming_purchase_price': '',
+    }
+    unknown = set(values) - set(sheet)
+    if unknown:
+        raise ValueError(f"Unknown trade sheet fields: {', '.join(sorted(unknown))}")
+    sheet.update(values)
+    return sheet
+
+# Page layout; y is measured down from the top of the page, 20pt below the original letter margins
+_width, _height = letter
+_offset = 20
+# Grey section bars: (top of the bar, baseline of its label, label)
+_section_bars = [
+    (180, 175, "Intercompany DX"),
+    (290, 285, "Non-Modern Dealership Information"),
+    (440, 435, "Outgoing Unit"),
+    (570, 565, "Incoming Unit"),
+]
+# Fixed text: (x, y, text)
+_labels = [
+    (72, 108, "OUR TRADE"), (200, 108, "THEIR TRADE"), (72, 144, "SOLD"), (200, 144, "FLOORPLAN"),
+    (320, 108, "PLEASE SEND MCO/CHECK TO:"), (320, 120, "MODERN AUTOMOTIVE SUPPORT CENTER"),
+    (320, 132, "3901 WEST POINT BLVD."), (320, 144, "WINSTON-SALEM, NC 27103"),
+    (72, 200, "From:"), (330, 200, "To:"),
+    (72, 220, "Stock Number:"), (72, 240, "Year/Make/Model:"), (72, 260, "Full VIN #:"), (330, 220, "Projected Cost:"),
+    (72, 310, "Dealership Name:"), (72, 330, "Address:"), (72, 350, "City, State ZIP Code:"),
+    (72, 370, "Phone Number:"), (72, 390, "Dealer Code:"), (72, 410, "Contact Name:"),
+    (72, 460, "Stock Number:"), (72, 480, "Year Make Model:"), (72, 500, "Full VIN #:"),
+    (72, 520, "Sale Price:"), (72, 540, "Projected Cost:"),
+    (72, 590, "Year Make Model:"), (72, 610, "Full VIN #:"), (72, 630, "Purchase Price:"),
+]
+# Checkbox marks: (x, y, field, mark)
+_marks = [
+    (72, 120, 'our_trade', '         X'), (200, 120, 'their_trade', '           X'),
+    (72, 156, 'sold', '   X'), (200, 156, 'floorplan', '          X'),
+]
+# Field values: (x, y, field)
+_values = [
+    (140, 200, 'from_location'), (380, 200, 'to_location'),
+    (160, 220, 'stock_number'), (160, 240, 'year_make_model'), (160, 260, 'full_vin'),
+    (190, 310, 'dealership_name'), (190, 330, 'address'), (190, 350, 'city_state_zip'),
+    (190, 370, 'phone_number'), (190, 390, 'dealer_code'), (190, 410, 'contact_name'),
+    (190, 460, 'outgoing_stock_number'), (190, 480, 'outgoing_year_make_model'), (190, 500, 'outgoing_full_vin'),
+    (190, 520, 'outgoing_sale_price'),
+    (190, 590, 'incoming_year_make_model'), (190, 610, 'incoming_full_vin'), (190, 630, 'incoming_purchase_price'),
+]
+_form_name = 'trade_sheet'
+
+def _y(top):
+    return _height - top - _offset
+
+def _draw_form(c):
+    """Define the fixed part of the sheet as a form on canvas c."""
+    c.beginForm(_form_name)
+    c.setFont("Helvetica", 10)
+    for bar_top, label_y, label in _section_bars:
+        c.setFillColorRGB(0.7, 0.7, 0.7)
+        c.rect(70, _y(bar_top), 475, 20, fill=1)
+        c.setFillColorRGB(0, 0, 0)
+        c.drawString(72, _y(label_y), label)
+    for x, y, text in _labels:
+        c.drawString(x, _y(y), text)
+    c.endForm()
+
+def _draw_sheet(c, sheet):
+    """One page: the form plus the values of sheet."""
+    c.doForm(_form_name)
+    location = sheet['to_location']
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(_width / 2.0, _y(52), f"{location} {get_store_number(location)}")
+    c.setFont("Helvetica", 10)
+    c.drawString(72, _y(84), f"Date: {sheet['date']}")
+    c.drawString(200, _y(84), f"Manager: {sheet['manager']}")
+    for x, y, field, mark in _marks:
+        if sheet[field]:
+            c.drawString(x, _y(y), mark)
+    for x, y, field in _values:
+        c.drawString(x, _y(y), str(sheet[field]))
+    c.drawString(420, _y(220), format_currency(sheet['projected_cost']))
+    c.drawString(190, _y(540), format_currency(sheet['outgoing_projected_cost']))
+    c.showPage()
+
+def trade_sheet_pdf(sheets):
+    """One PDF with a page per sheet, the fixed layout stored once and shared by every page."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    _draw_form(c)
+    for sheet in sheets:
+        _draw_sheet(c, sheet)
+    c.save()
+    return buffer.getvalue()
+
+def _sheet_pdfs(chunk):
+    """Worker: a separate PDF for every sheet in chunk."""
+    return [trade_sheet_pdf([sheet]) for sheet in chunk]
+
+def trade_sheet_pdfs(sheets, max_workers=None):
+    """A separate PDF per sheet, in order; large batches are split over worker processes.
+
+    reportlab is pure Python and holds the GIL, so the work goes to processes rather than threads,
+    one contiguous chunk per worker. The workers are spawned: forking the threaded server isn't safe.
+    """
+    sheets = list(sheets)
+    workers = min(max_workers or os.cpu_count() or 1, len(sheets) // (min_parallel_sheets // 2) or 1)
+    if len(sheets) >= min_parallel_sheets and workers > 1:
+        size = -(-len(sheets) // workers)
+        chunks = [sheets[i:i + size] for i in range(0, len(sheets), size)]
+        try:
+            with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context('spawn')) as pool:
+                return [pdf for chunk in pool.map(_sheet_pdfs, chunks) for pdf in chunk]
+        except Exception:
+            pass  # no usable process pool here; build them in-process instead
+    return _sheet_pdfs(sheets)
+
+def sheet_file_name(sheet):
+    """dealer_trade_<stock or VIN>.pdf, with anything but letters, digits, '-' and '_' dropped."""
+    label = re.sub(r'[^A-Za-z0-9_-]', '', str(sheet['stock_number'] or sheet['full_vin']))
+    return f"dealer_trade_{label}.pdf" if label else "dealer_trade.pdf"
+
+def trade_sheets_zip(sheets, max_workers=None):
+    """A ZIP holding one PDF per sheet, named by sheet_file_name (numbered where names repeat)."""
+    sheets = list(sheets)
+    buffer = BytesIO()
+    seen = {}
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for sheet, pdf in zip(sheets, trade_sheet_pdfs(sheets, max_workers)):
+            name = sheet_file_name(sheet)
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name[:-4]}_{seen[name]}.pdf"
+            archive.writestr(name, pdf)
+    return buffer.getvalue()
+
+trade_unit_columns = ['VIN', 'Stock Number', 'Year Make Model', 'From', 'To', 'Projected Cost']
+
+def _text(values):
+    return values.astype('string').fillna('').str.strip()
+
+def trade_units(df, source):
+    """The units of an All Stores ('inventory') or Current CDK ('cdk') frame as trade rows.
+
+    Columns are trade_unit_columns; To starts empty. The CDK BALANCE (floorplan balance) stands in
+    for the projected cost, and the inventory exports have no stock number.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=trade_unit_columns)
+    model = _text(df['MDL']).map(lambda mdl: reverse_mdl_mapping.get(mdl, mdl))
+    if source == 'cdk':
+        units = pd.DataFrame({
+            'VIN': _text(df['VIN']),
+            'Stock Number': _text(df['STOCK']),
+            'Year Make Model': df['YEAR'].astype(str) + ' NISSAN ' + model,
+            'From': df['COMPANY'].map(location_by_company).fillna(''),
+            'Projected Cost': df['BALANCE'].astype(float),
+        })
+    else:
+        units = pd.DataFrame({
+            'VIN': _text(df['VIN']),
+            'Stock Number': '',
+            'Year Make Model': (_text(df['MDLYR']) + ' NISSAN ' + model + ' ' + _text(df['TRIM'])).str.strip(),
+            'From': _text(df['DEALER_SHORT']).map(location_by_dealer).fillna(''),
+            'Projected Cost': 0.0,
+        })
+    units['To'] = ''
+    return units[trade_unit_columns].reset_index(drop=True)
+
+def units_from_csv(file, units):
+    """Trade rows for the VINs in a CSV upload (a VIN column, optionally To/Destination).
+
+    Each VIN is looked up in units (trade_units output) for the rest of its row, and To is matched
+    against the trade locations with trade_location. Returns (rows, errors): a VIN that isn't in
+    units gets no row, and an unknown destination leaves To empty; both are reported in errors.
+    """
+    csv = pd.read_csv(file, dtype=str, keep_default_na=False)
+    csv.columns = [str(col).strip().upper() for col in csv.columns]
+    if 'VIN' not in csv.columns:
+        raise ValueError("The CSV needs a VIN column.")
+    destination = next((col for col in ('TO', 'DESTINATION') if col in csv.columns), None)
+    csv['VIN'] = csv['VIN'].str.strip().str.upper()
+    csv['LINE'] = csv.index + 2  # after the header line
+    csv = csv[csv['VIN'] != '']
+    rows = csv[['VIN', 'LINE']].merge(
+        units.drop(columns='To').drop_duplicates('VIN'), on='VIN', how='left', indicator=True
+    )
+    found = (rows.pop('_merge') == 'both').to_numpy()
+    errors = [f"Line {line}: VIN {vin} isn't in the loaded inventory"
+              for vin, line in zip(rows['VIN'][~found], rows['LINE'][~found])]
+    rows['To'] = ''
+    if destination:
+        names = csv[destination].str.strip().to_numpy()
+        for i, name in enumerate(names):
+            location = trade_location(name) if name else ''
+            if location is None:
+                if found[i]:
+                    errors.append(f"Line {rows['LINE'].iat[i]}: unknown destination '{name}' for VIN {rows['VIN'].iat[i]}")
+                location = ''
+            rows.loc[i, 'To'] = location
+    return rows[found][trade_unit_columns].reset_index(drop=True), errors
+
+def trade_unit_problems(units):
+    """What stops the trade rows from being printed: a row without a VIN, or without a known From
+    and To (or with the same store as both). An empty list when every row is ready."""
+    problems = []
+    for n, (vin, from_location, to_location) in enumerate(units[['VIN', 'From', 'To']].itertuples(index=False), 1):
+        vin, from_location, to_location = (value if isinstance(value, str) else '' for value in (vin, from_location, to_location))
+        label = vin or f"Row {n}"
+        if not vin:
+            problems.append(f"Row {n} has no VIN")
+        if from_location not in store_numbers:
+            problems.append(f"{label}: unknown origin '{from_location}'" if from_location else f"{label}: choose the store it comes from")
+        if to_location not in store_numbers:
+            problems.append(f"{label}: unknown destination '{to_location}'" if to_location else f"{label}: choose a destination")
+        elif to_location == from_location:
+            problems.append(f"{label}: From and To are the same store")
+    return problems
+
+def sheets_for_units(units, **shared):
+    """One sheet per trade row, with the fields in shared (date, manager, checkboxes ...) on every sheet.
+
+    Raises ValueError when trade_unit_problems finds a row that isn't ready.
+    """
+    problems = trade_unit_problems(units)
+    if problems:
+        raise ValueError("; ".join(problems))
+    return [
+        blank_sheet(
+            **shared,
+            full_vin=vin, stock_number=stock, year_make_model=year_make_model,
+            from_location=from_location, to_location=to_location, projected_cost=0.0 if pd.isna(cost) else float(cost),
+        )
+        for vin, stock, year_make_model, from_location, to_location, cost in units[trade_unit_columns].itertuples(index=False)
+    ]